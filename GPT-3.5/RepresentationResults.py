@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
+import os
+import sys
 
 
 plt.style.use('seaborn-whitegrid')
@@ -10,13 +12,19 @@ plt.rcParams['font.family'] = 'DejaVu Sans'
 COLORS = sns.color_palette("husl", 4)
 
 
-df = pd.read_csv('GPT-3.5_resultados_ejecucion.csv', sep=';', decimal=',', encoding='latin-1',
-                converters={'Execution '+str(i): lambda x: np.nan if (x == 'Error en ejecución' or x == 'Timeout' or x == 'Error de sintaxis') else float(x.replace(',','.')) 
-                          for i in range(1,11)})
+# Parquet warehouse written with benchmark_engine.py --warehouse (None: read the CSV)
+WAREHOUSE_DIR = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from execution_results import load_execution_results, summarize_executions
+from results_warehouse import execution_table
+
+if WAREHOUSE_DIR:
+    df = summarize_executions(execution_table('GPT-3.5', WAREHOUSE_DIR, runs=10))
+else:
+    df = load_execution_results('GPT-3.5_resultados_ejecucion.csv')
 
 
-df['NLQ_ID'] = df['NLQ'].str.extract('(\d+) -').astype(int)
-df['Success Rate'] = df[[f'Execution {i}' for i in range(1,11)]].apply(lambda x: x.notna().mean(), axis=1)
 
 
 
@@ -176,7 +184,7 @@ melted = df.melt(id_vars=['NLQ_ID', 'NLQ'],
                 value_name='Tiempo')
 
 
-melted = melted[melted['Tiempo'].apply(lambda x: isinstance(x, (int, float)))]
+melted = melted[melted['Tiempo'].notna()]
 
 
 melted = melted.sort_values('NLQ_ID')
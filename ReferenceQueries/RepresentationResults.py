@@ -2,6 +2,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
+import os
+import sys
 
 # Configuración estética para paper científico
 plt.style.use('seaborn-whitegrid')
@@ -10,13 +12,17 @@ plt.rcParams['font.family'] = 'DejaVu Sans'
 COLORS = sns.color_palette("husl", 4)
 
 # Leer CSV con formato específico
-df = pd.read_csv('ReferenceQueries_resultados_ejecucion.csv', sep=';', decimal=',', encoding='latin-1',
-                converters={'Execution '+str(i): lambda x: np.nan if (x == 'Error en ejecución' or x == 'Timeout' or x == 'Error de sintaxis') else float(x.replace(',','.')) 
-                          for i in range(1,11)})
+# Parquet warehouse written with benchmark_engine.py --warehouse (None: read the CSV)
+WAREHOUSE_DIR = None
 
-# Preparar datos
-df['NLQ_ID'] = df['NLQ'].str.extract('(\d+) -').astype(int)
-df['Success Rate'] = df[[f'Execution {i}' for i in range(1,11)]].apply(lambda x: x.notna().mean(), axis=1)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from execution_results import load_execution_results, summarize_executions
+from results_warehouse import execution_table
+
+if WAREHOUSE_DIR:
+    df = summarize_executions(execution_table('ReferenceQueries', WAREHOUSE_DIR, runs=10))
+else:
+    df = load_execution_results('ReferenceQueries_resultados_ejecucion.csv')
 
 # 1. Gráfico de distribución de Times por consulta
 #plt.figure(figsize=(14, 8))
@@ -121,7 +127,7 @@ melted = df.melt(id_vars=['NLQ_ID', 'NLQ'],
                 value_name='Tiempo')
 
 # Filtrar solo valores numéricos y convertir tiempos a segundos
-melted = melted[melted['Tiempo'].apply(lambda x: isinstance(x, (int, float)))]
+melted = melted[melted['Tiempo'].notna()]
 
 # Ordenar por NLQ_ID
 melted = melted.sort_values('NLQ_ID')
@@ -181,7 +187,7 @@ melted = df.melt(id_vars=['NLQ_ID', 'NLQ'],
                 value_name='Tiempo')
 
 # Filtrar y limpiar datos
-melted = melted[melted['Tiempo'].apply(lambda x: isinstance(x, (int, float)) and x > 0)]
+melted = melted[melted['Tiempo'] > 0]
 
 # Crear gráfico con escala logarítmica
 ax = sns.boxplot(x='NLQ_ID', y='Tiempo', data=melted, showfliers=False, width=0.6)
@@ -0,0 +1,164 @@
+"""Asyncio execution backend for the untimed capture/validation passes.
+
+Built on psycopg 3 (``pip install "psycopg[binary,pool]"``). Many statements
+are kept in flight across an AsyncConnectionPool, each one bounded by its own
+timeout; a task that runs out of time is cancelled and its server query is
+cancelled too. Captures have the same shape as benchmark_engine.capture_result
+so both the benchmark engine and generate_llm_reports.py can use either backend.
+"""
+import asyncio
+import uuid
+
+from execution_accuracy import MultisetFingerprint
+from query_watchdog import CLIENT_TIMEOUT
+from result_capture import FETCH_SIZE, SNAPSHOT_ISOLATION_SQL, ResultCapture, RowFanout, is_row_returning
+from session_state import STATE_RESET_SQL
+
+try:
+    import psycopg
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # optional dependency, only needed for --backend async
+    psycopg = None
+    AsyncConnectionPool = None
+
+
+CONCURRENCY = 8
+# Extra client-side seconds so statement_timeout normally fires first
+CANCEL_GRACE = 2.0
+
+
+def conninfo(db_config):
+    return ' '.join(f"{key}='{value}'" for key, value in db_config.items())
+
+
+def classify_error(e):
+    """Same labels as benchmark_engine.classify_error, for psycopg 3 errors"""
+    if isinstance(e, asyncio.TimeoutError):
+        return CLIENT_TIMEOUT
+    sqlstate = getattr(e, 'sqlstate', None)
+    if sqlstate == '57014':
+        return 'Timeout'
+    if sqlstate == '42601':
+        return 'Error de sintaxis'
+    return 'Error en ejecución'
+
+
+def _failure(message, error_type, preview_chars):
+    return {'Result': f"Error: {message}"[:preview_chars], 'Rows': 0, 'Result Hash': '',
+            'Multiset': None, 'Failed': True, 'Status': error_type, 'Result ID': ''}
+
+
+async def _stream_plain(conn, query, capture, fetch_size):
+    async with conn.cursor() as cursor:
+        await cursor.execute(query)
+        if not cursor.description:
+            return None
+        capture.set_columns(cursor.description)
+        while rows := await cursor.fetchmany(fetch_size):
+            capture.add_rows(rows)
+    return capture
+
+
+async def _stream(conn, query, capture, fetch_size, snapshot=None):
+    if not is_row_returning(query) and snapshot is None:
+        return await _stream_plain(conn, query, capture, fetch_size)
+
+    async with conn.transaction():
+        if snapshot is not None:
+            async with conn.cursor() as cursor:
+                await cursor.execute(SNAPSHOT_ISOLATION_SQL)
+                # SET takes no bind parameters; the id comes from pg_export_snapshot()
+                await cursor.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}';")
+        if not is_row_returning(query):
+            return await _stream_plain(conn, query, capture, fetch_size)
+        async with conn.cursor(name=f'capture_{uuid.uuid4().hex[:12]}') as cursor:
+            await cursor.execute(query)
+            capture.set_columns(cursor.description)
+            while rows := await cursor.fetchmany(fetch_size):
+                capture.add_rows(rows)
+    return capture
+
+
+async def _within(conn, coro, timeout):
+    """Await coro for at most timeout seconds
+
+    On timeout the server statement is cancelled first, and only then is the
+    task cancelled and awaited, so the deadline bounds the server side too.
+    """
+    task = asyncio.ensure_future(coro)
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if done:
+        return task.result()
+    try:
+        conn.cancel()
+    except Exception:
+        pass
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    raise asyncio.TimeoutError
+
+
+async def capture_one(pool, query, settings):
+    """Capture one statement on a pooled connection within settings['timeout_ms']
+
+    settings['snapshot_id'] (see result_capture.ExportedSnapshot) pins the
+    capture to the coordinator's snapshot, and settings['result_store'] keeps
+    the full result.
+    """
+    preview_chars = settings.get('preview_chars', 2000)
+    timeout = settings.get('timeout_ms', 30000) / 1000 + CANCEL_GRACE
+    multiset = MultisetFingerprint(settings.get('column_permutation', False),
+                                   settings.get('numeric_digits', 6))
+    writer = settings['result_store'].writer() if settings.get('result_store') else None
+    capture = ResultCapture(preview_chars, RowFanout(multiset, writer))
+    async with pool.connection() as conn:
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(STATE_RESET_SQL)
+                await cursor.execute(f"SET statement_timeout TO {int(settings.get('timeout_ms', 30000))};")
+            result = await _within(conn, _stream(conn, query, capture, FETCH_SIZE, settings.get('snapshot_id')),
+                                   timeout)
+        except asyncio.TimeoutError as e:
+            # the pool discards the connection if it is left in a broken state
+            if writer:
+                writer.discard()
+            return _failure(f"client timeout after {timeout:g} s", classify_error(e), preview_chars)
+        except Exception as e:
+            if writer:
+                writer.discard()
+            return _failure(str(e), classify_error(e), preview_chars)
+    if result is None:
+        if writer:
+            writer.discard()
+        return {'Result': "Executed query (No results)", 'Rows': 0, 'Result Hash': '',
+                'Multiset': None, 'Failed': False, 'Status': 'OK', 'Result ID': ''}
+    return {'Result': result.text(), 'Rows': result.rows, 'Result Hash': result.result_hash,
+            'Multiset': multiset, 'Failed': False, 'Status': 'OK',
+            'Result ID': writer.commit(result.columns) if writer else ''}
+
+
+async def capture_many_async(queries, db_config, settings=None, concurrency=CONCURRENCY, on_done=None):
+    """Capture every query concurrently, returning the captures in input order"""
+    settings = settings or {}
+    async with AsyncConnectionPool(conninfo(db_config), min_size=1, max_size=concurrency,
+                                   kwargs={'autocommit': True}, open=False) as pool:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index, query):
+            async with semaphore:
+                capture = await capture_one(pool, query, settings)
+            if on_done:
+                on_done(index, query, capture)
+            return capture
+
+        return await asyncio.gather(*(run(i, q) for i, q in enumerate(queries)))
+
+
+def capture_many(queries, db_config, settings=None, concurrency=CONCURRENCY, on_done=None):
+    """Blocking entry point used by the benchmark engine and the report script"""
+    if psycopg is None:
+        raise RuntimeError('The async backend needs psycopg 3: pip install "psycopg[binary,pool]"')
+    return asyncio.run(capture_many_async(list(queries), db_config, settings, concurrency, on_done))
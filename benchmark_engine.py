@@ -0,0 +1,1295 @@
+"""Unified benchmark engine for the NLQ-to-SQL evaluation workbooks.
+
+Runs the Q1-Q10 variants stored in every ``<model>/<model>-Evaluation.xlsx``
+workbook against the AFarCloud database from a single process, sharing one
+connection and one configuration, and writes a single consolidated CSV.
+
+Usage:
+    python benchmark_engine.py                       # auto-discover all models
+    python benchmark_engine.py GPT-4o DeepSeek       # only the given folders
+    python benchmark_engine.py --runs 5 --timeout-ms 10000 -o all.csv
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import subprocess
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from math import sqrt
+from statistics import NormalDist, mean, median, stdev
+
+import pandas as pd
+import psycopg2
+from psycopg2 import ProgrammingError, errors
+
+import execution_accuracy
+from execution_accuracy import INCORRECT, MultisetFingerprint, load_references, verdict
+from query_watchdog import CLIENT_TIMEOUT, ClientTimeout, Watchdog
+from result_capture import (ROW_RETURNING, ExportedSnapshot, RowFanout, is_row_returning, leading_keyword,
+                            stream_result)
+from result_diff import diff_query, format_diff, reference_path
+from result_store import ResultStore
+from results_warehouse import Warehouse
+from run_store import RunStore
+from session_state import STATE_RESET_SQL
+from sql_fingerprint import fingerprint, statement_count, syntax_problem
+
+
+DB_CONFIG = {
+    'dbname': 'AFarCloud',
+    'user': 'postgres',
+    'password': 'admin',
+    'host': 'localhost',
+    'port': '5432'
+}
+
+SETTINGS = {
+    'runs': 10,
+    'timeout_ms': 30000,
+    'client_timeout_ms': None,
+    'lock_timeout': '10s',
+    'max_query': 10,
+    'measurement': 'legacy',
+    'stop_on_error': False,
+    'max_timeouts': 0,
+    'adaptive': False,
+    'target_precision': 0.05,
+    'confidence': 0.95,
+    'min_runs': 3,
+    'max_runs': 30,
+    'max_seconds': 60,
+    'dedup': True,
+    'capture': True,
+    'preview_chars': 2000,
+    'reference_dir': execution_accuracy.REFERENCE_DIR,
+    'column_permutation': False,
+    'numeric_digits': 6,
+    'store_dir': None,
+    'warehouse_dir': None,
+    'diff_rows': 0,
+    'diff_memory_mb': 64,
+    'backend': 'sync',
+    'transport': 'separate',
+    'explain': 'off',
+    'cache_mode': 'mixed',
+    'warmup_runs': 1,
+    'prewarm': False,
+    'cold_hook': 'pg_buffercache',
+    'cold_runs': 3,
+    'validate': False,
+    'max_cost': None,
+    'max_rows': None,
+    'over_budget': 'skip',
+    'timeout_multiplier': None,
+    'timeout_floor_ms': 1000,
+    'reference_times': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ReferenceQueries',
+                                    'ReferenceQueries_resultados_ejecucion-1.csv'),
+    'concurrency': 8,
+    'snapshot': False,
+    'output': 'benchmark_resultados_ejecucion.csv',
+}
+
+# Timeouts that differ from the default, as used by the original per-model scripts
+MODEL_TIMEOUTS = {
+    'GPT-4o': 10000,
+    'GPT-4o_mini': 20000,
+    'ReferenceQueries': 10000,
+}
+
+CALIBRATION_SAMPLES = 20
+
+# SQLSTATE classes that fail the same way on every run: data exceptions,
+# unsupported features and syntax/access rule violations (42601, 42P01, 42703...)
+DETERMINISTIC_SQLSTATE_CLASSES = ('0A', '22', '42')
+SKIPPED = 'Skipped'
+TIMEOUTS = ('Timeout', CLIENT_TIMEOUT)
+
+# Validation categories of the SQLSTATEs raised while planning a statement
+VALIDATION_CATEGORIES = {
+    '42601': 'Syntax error',
+    '42P01': 'Missing relation',
+    '3F000': 'Missing relation',
+    '42703': 'Missing column',
+    '42P10': 'Missing column',
+    '42804': 'Type error',
+    '42883': 'Type error',
+    '42846': 'Type error',
+    '42725': 'Type error',
+}
+VALID = 'OK'
+# SQLSTATE classes of planning errors that belong to the statement: syntax/access rule violations and data exceptions
+VALIDATION_SQLSTATE_CLASSES = ('42', '22')
+EXPLAINABLE = ROW_RETURNING + ('insert', 'update', 'delete', 'merge', 'execute')
+# Leading keywords of the PostgreSQL commands; statements starting with any
+# other word are EXPLAINed anyway so the server reports the syntax error
+COMMANDS = {
+    'abort', 'alter', 'analyze', 'begin', 'call', 'checkpoint', 'close', 'cluster', 'comment', 'commit',
+    'copy', 'create', 'deallocate', 'declare', 'delete', 'discard', 'do', 'drop', 'end', 'execute',
+    'explain', 'fetch', 'grant', 'import', 'insert', 'listen', 'load', 'lock', 'merge', 'move', 'notify',
+    'prepare', 'reassign', 'refresh', 'reindex', 'release', 'reset', 'revoke', 'rollback', 'savepoint',
+    'security', 'select', 'set', 'show', 'start', 'table', 'truncate', 'unlisten', 'update', 'vacuum',
+    'values', 'with',
+}
+VALIDATION_COLUMN = 'Validation'
+OVER_BUDGET = 'Over budget'
+BUDGET_COLUMNS = ['Estimated Cost', 'Estimated Rows', 'Budget']
+TIMEOUT_COLUMN = 'Timeout (ms)'
+
+REFERENCE_DIR = 'ReferenceQueries'
+WORKBOOK_SUFFIX = '-Evaluation.xlsx'
+
+
+def classify_error(e):
+    """PostgreSQL type of error classification"""
+    if isinstance(e, ClientTimeout):
+        return CLIENT_TIMEOUT
+    if isinstance(e, errors.QueryCanceled):
+        return 'Timeout'
+    if isinstance(e, ProgrammingError):
+        if e.pgcode == '42601':  # Syntax error
+            return 'Error de sintaxis'
+    return 'Error en ejecución'
+
+
+def is_deterministic_error(e):
+    """True when repeating the statement cannot change the outcome"""
+    pgcode = getattr(e, 'pgcode', None)
+    return bool(pgcode) and pgcode[:2] in DETERMINISTIC_SQLSTATE_CLASSES
+
+
+def discover_models(root='.', include_reference=False):
+    """Return the model folders under root that hold a <model>-Evaluation.xlsx workbook"""
+    models = []
+    for path in sorted(glob.glob(os.path.join(root, '*', '*' + WORKBOOK_SUFFIX))):
+        model_dir = os.path.dirname(path)
+        name = os.path.basename(model_dir)
+        if os.path.basename(path) != name + WORKBOOK_SUFFIX:
+            continue
+        if name == REFERENCE_DIR and not include_reference:
+            continue
+        models.append(model_dir)
+    return models
+
+
+def load_reference_medians(path):
+    """Median runtime in seconds of each reference query, keyed by NLQ id"""
+    df = pd.read_csv(path, sep=';', decimal=',', encoding='latin-1')
+    runs = df[[c for c in df.columns if c.startswith('Execution')]].apply(pd.to_numeric, errors='coerce')
+    medians = runs.median(axis=1)
+    return {nlq_id(nlq): float(m) for nlq, m in zip(df['NLQ'], medians) if m == m}
+
+
+def query_timeout(nlq, settings):
+    """statement_timeout of one cell
+
+    With settings['timeout_multiplier'] it is that multiple of the reference
+    query's median runtime, clamped between timeout_floor_ms and the model
+    timeout; NLQs without a reference keep the model timeout.
+    """
+    reference = settings.get('reference_medians', {}).get(nlq_id(nlq))
+    if not settings['timeout_multiplier'] or reference is None:
+        return settings['timeout_ms']
+    timeout_ms = int(reference * 1000 * settings['timeout_multiplier'])
+    return min(max(timeout_ms, settings['timeout_floor_ms']), settings['timeout_ms'])
+
+
+def resolve_workbook(model):
+    """Map a model folder (or a workbook path) to (model name, workbook path)"""
+    if model.endswith('.xlsx'):
+        name = os.path.basename(model)[:-len(WORKBOOK_SUFFIX)] if model.endswith(WORKBOOK_SUFFIX) \
+            else os.path.splitext(os.path.basename(model))[0]
+        return name, model
+    model = model.rstrip('/\\')
+    name = os.path.basename(model)
+    return name, os.path.join(model, name + WORKBOOK_SUFFIX)
+
+
+def load_queries(workbook, max_query=10):
+    """Yield (nlq, q_num, query) for every non empty Q cell of an evaluation workbook"""
+    df = pd.read_excel(workbook, sheet_name='Sheet1', header=1)
+    for _, row in df.iterrows():
+        nlq = row['NLQ']
+        for q_num in range(1, max_query + 1):
+            query = row.get(f'Q{q_num}')
+            if query is None or pd.isna(query):
+                continue
+            yield nlq, q_num, query
+
+
+def connect(db_config=None):
+    """Open an autocommit connection shared by all the models of a session"""
+    conn = psycopg2.connect(**(db_config or DB_CONFIG))
+    conn.autocommit = True
+    return conn
+
+
+def session_setup_sql(settings):
+    """Session GUCs of a benchmark as a single multi-statement batch"""
+    return (f"SET statement_timeout TO {int(settings['timeout_ms'])}; "
+            f"SET lock_timeout TO '{settings['lock_timeout']}';")
+
+
+def configure_session(conn, settings):
+    """Apply the session settings once per connection instead of once per run"""
+    with conn.cursor() as cursor:
+        cursor.execute(session_setup_sql(settings))
+
+
+def reset_session(cursor):
+    """Clear session state (plans, temp tables, portals...) keeping the configured GUCs"""
+    cursor.execute(STATE_RESET_SQL)
+
+
+def calibrate_overhead(conn, samples=CALIBRATION_SAMPLES):
+    """Median client/round-trip time of a trivial statement, in seconds"""
+    timings = []
+    with conn.cursor() as cursor:
+        for _ in range(samples):
+            start = time.perf_counter()
+            cursor.execute("SELECT 1;")
+            timings.append(time.perf_counter() - start)
+    return round(median(timings), 4)
+
+
+def capture_result(conn, query, preview_chars=SETTINGS['preview_chars'], settings=None):
+    """Untimed run that records the row count, a result hash and a text preview
+
+    'Multiset' holds the order-insensitive fingerprint used for Execution
+    Accuracy. settings['snapshot_id'] pins it to the session's exported snapshot.
+    With settings['result_store'] (a ResultStore) the full result is stored and
+    'Result ID' points to it.
+    """
+    settings = {**SETTINGS, **(settings or {})}
+    multiset = MultisetFingerprint(settings['column_permutation'], settings['numeric_digits'])
+    writer = settings['result_store'].writer() if settings.get('result_store') else None
+    try:
+        with conn.cursor() as cursor:
+            reset_session(cursor)
+        with Watchdog(conn, settings['client_timeout_ms']):
+            capture = stream_result(conn, query, preview_chars, fingerprint=RowFanout(multiset, writer),
+                                    snapshot=settings.get('snapshot_id'))
+    except Exception as e:
+        conn.rollback()
+        if writer:
+            writer.discard()
+        return {'Result': f"Error: {str(e)}"[:preview_chars], 'Rows': 0, 'Result Hash': '',
+                'Multiset': None, 'Failed': True, 'Status': classify_error(e), 'Result ID': ''}
+    if capture is None:
+        if writer:
+            writer.discard()
+        return {'Result': "Executed query (No results)", 'Rows': 0, 'Result Hash': '',
+                'Multiset': None, 'Failed': False, 'Status': 'OK', 'Result ID': ''}
+    return {'Result': capture.text(), 'Rows': capture.rows, 'Result Hash': capture.result_hash,
+            'Multiset': multiset, 'Failed': False, 'Status': 'OK',
+            'Result ID': writer.commit(capture.columns) if writer else ''}
+
+
+def unexecuted_capture(status, message, preview_chars=SETTINGS['preview_chars']):
+    """Failed capture of a statement kept out of execution (rejected by validation or over budget)"""
+    return {'Result': f"Error: {message}"[:preview_chars], 'Rows': 0, 'Result Hash': '',
+            'Multiset': None, 'Failed': True, 'Status': status, 'Result ID': ''}
+
+
+def mismatch_diff(conn, query, nlq, settings):
+    """Row diff of an Incorrect capture against its reference output (untimed rerun)"""
+    path = reference_path(nlq_id(nlq), settings['reference_dir'])
+    try:
+        with Watchdog(conn, settings['client_timeout_ms']):
+            diff = diff_query(conn, query, path, settings)
+    except Exception as e:
+        conn.rollback()
+        return f"Diff failed: {str(e)[:200]}"
+    return format_diff(diff, settings['preview_chars'])
+
+
+def explain_analyze(conn, query):
+    """Server-side timing of one execution: planning/execution ms, buffers and JSON plan"""
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+            plan = cursor.fetchone()[0]
+        except Exception as e:
+            conn.rollback()
+            print(f"EXPLAIN ANALYZE failed: {str(e)[:200]}")
+            return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]
+    return {
+        'Planning Time': top.get('Planning Time'),
+        'Execution Time': top.get('Execution Time'),
+        'Shared Hit Blocks': top['Plan'].get('Shared Hit Blocks'),
+        'Shared Read Blocks': top['Plan'].get('Shared Read Blocks'),
+        'Plan': json.dumps(plan),
+    }
+
+
+def is_explainable(query):
+    return leading_keyword(query) in EXPLAINABLE and statement_count(query) == 1
+
+
+def starts_with_command(query):
+    """True when the first token is '(' or the keyword of a PostgreSQL command (SELEC is not)"""
+    return leading_keyword(query) in COMMANDS | {'('}
+
+
+def estimate_plan(conn, query):
+    """Planner estimates of a plain EXPLAIN: total cost and rows of the top node"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]['Plan']
+    return {'Estimated Cost': top.get('Total Cost'), 'Estimated Rows': top.get('Plan Rows')}
+
+
+def estimate_query(conn, query):
+    """estimate_plan, or {} when the statement cannot be planned"""
+    if not is_explainable(query):
+        return {}
+    try:
+        return estimate_plan(conn, query)
+    except Exception as e:
+        conn.rollback()
+        print(f"EXPLAIN failed: {str(e)[:200]}")
+        return {}
+
+
+def validate_query(conn, query, estimate=None):
+    """Parse query locally and plan it once with a plain EXPLAIN (nothing is executed)
+
+    Returns None when the statement can run, otherwise a dict with the
+    Validation category, the error type written in the execution columns and
+    the error message. Statements that cannot be EXPLAINed (DDL, several
+    statements) are only checked locally, except when they do not start with a
+    command keyword: those are EXPLAINed so the server reports the syntax
+    error. Only errors of the statement itself (SQLSTATE classes 42 and 22)
+    reject it; any other planning failure (lock timeout, lost connection...)
+    lets it run, and its timed runs record the error. The planner estimates
+    are added to the estimate dict, if given.
+    """
+    problem = syntax_problem(query)
+    if problem:
+        return {'Validation': VALIDATION_CATEGORIES['42601'], 'Error': 'Error de sintaxis', 'Message': problem}
+    if not is_explainable(query) and starts_with_command(query):
+        return None
+    try:
+        planned = estimate_plan(conn, query)
+    except Exception as e:
+        rollback(conn)
+        pgcode = getattr(e, 'pgcode', None) or ''
+        if pgcode[:2] not in VALIDATION_SQLSTATE_CLASSES:
+            print(f"EXPLAIN failed, not a property of the statement: {str(e)[:200]}")
+            return None
+        category = VALIDATION_CATEGORIES.get(pgcode)
+        if category is None:
+            category = 'Type error' if pgcode[:2] == '22' else 'Invalid'
+        return {'Validation': category, 'Error': classify_error(e), 'Message': str(e).strip()}
+    if estimate is not None:
+        estimate.update(planned)
+    return None
+
+
+def over_budget(estimate, settings):
+    """True when the planner estimates exceed settings['max_cost'] or settings['max_rows']"""
+    cost, rows = estimate.get('Estimated Cost'), estimate.get('Estimated Rows')
+    return bool(settings['max_cost'] and cost is not None and cost > settings['max_cost']
+                or settings['max_rows'] and rows is not None and rows > settings['max_rows'])
+
+
+def rejected_series(error_type, settings, previous=None, on_result=None):
+    """Results of a statement kept out of the timed runs: one error, then SKIPPED runs"""
+    results = list(previous or [])
+    runs = 1 if settings['adaptive'] else settings['runs']
+    while len(results) < runs:
+        results.append(SKIPPED if results else error_type)
+        if on_result:
+            on_result(len(results), results[-1])
+    return results
+
+
+def summarize_explains(explains):
+    """Median of every EXPLAIN ANALYZE metric over the recorded runs"""
+    summary = {}
+    for column in EXPLAIN_COLUMNS:
+        values = [e[column] for e in explains if e and e.get(column) is not None]
+        summary[column] = round(median(values), 4) if values else 'N/A'
+    return summary
+
+
+def _run_legacy(cursor, query, settings):
+    """Original methodology: per-run SET/restore, session reset inside the timed window
+
+    The reset is STATE_RESET_SQL rather than DISCARD ALL: its RESET ALL would
+    clear the statement_timeout just SET, so the timeout never fired.
+
+    With settings['transport'] == 'batched' the SHOW/SET/SET/restore round trips
+    collapse into one setup batch; the timed window is unchanged, and keeps the
+    batched SETs for the same reason.
+    """
+    if settings['transport'] == 'batched':
+        cursor.execute(session_setup_sql(settings))
+        start = time.perf_counter()
+        reset_session(cursor)
+        cursor.execute(query)
+        return round(time.perf_counter() - start, 4)
+
+    original_timeout = None
+    try:
+        cursor.execute("SHOW statement_timeout;")
+        original_timeout = cursor.fetchone()[0]
+        cursor.execute(f"SET statement_timeout TO {int(settings['timeout_ms'])};")
+        cursor.execute(f"SET lock_timeout TO '{settings['lock_timeout']}';")
+
+        start = time.perf_counter()
+        reset_session(cursor)
+        cursor.execute(query)
+        return round(time.perf_counter() - start, 4)
+    finally:
+        try:
+            if original_timeout:
+                cursor.execute(f"SET statement_timeout TO '{original_timeout}';")
+        except Exception as restore_error:
+            print(f"Error restaurando timeout: {str(restore_error)}")
+
+
+def _run_isolated(cursor, query, settings):
+    """Reset state outside the timed window and time only the target statement"""
+    reset_session(cursor)
+    start = time.perf_counter()
+    cursor.execute(query)
+    return round(time.perf_counter() - start, 4)
+
+
+def prepared_name(query):
+    return f"bench_{fingerprint(query)}"
+
+
+def prepare_statement(cursor, query):
+    """PREPARE the query under its prepared_name, next to the statements already prepared"""
+    cursor.execute(f"PREPARE {prepared_name(query)} AS {query}")
+
+
+def _prepare_statement(cursor, query, settings):
+    """Fresh PREPARE of the query; its first EXECUTE pays for planning"""
+    reset_session(cursor)
+    prepare_statement(cursor, query)
+
+
+def _run_prepared(cursor, query, settings):
+    """Time EXECUTE of the prepared statement: run 1 plans, later runs reuse the cached plan"""
+    start = time.perf_counter()
+    cursor.execute(f"EXECUTE {prepared_name(query)};")
+    return round(time.perf_counter() - start, 4)
+
+
+MEASUREMENTS = {
+    'legacy': _run_legacy,
+    'isolated': _run_isolated,
+    'prepared': _run_prepared,
+}
+
+# Per query setup run once before the first timed run of a series
+PREPARATIONS = {
+    'prepared': _prepare_statement,
+}
+
+# Measurements that configure the session once per model (see configure_session)
+SESSION_MEASUREMENTS = ('isolated', 'prepared')
+
+
+def evict_shared_buffers(settings):
+    """Evict every relation page from shared_buffers (pg_buffercache 1.5+, PostgreSQL 17+)"""
+    conn = connect(settings.get('db_config'))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT count(pg_buffercache_evict(bufferid)) FROM pg_buffercache "
+                           "WHERE relfilenode IS NOT NULL;")
+    finally:
+        conn.close()
+
+
+def buffercache_available(conn):
+    """Whether pg_buffercache_evict() exists in the database (pg_buffercache 1.5+, PostgreSQL 17+)"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regprocedure('pg_buffercache_evict(integer)') IS NOT NULL;")
+        return cursor.fetchone()[0]
+
+
+# Named cold-cache hooks; any other --cold-hook value is run as a shell command
+# (e.g. restarting a disposable server and dropping the OS page cache)
+COLD_HOOKS = {
+    'none': lambda settings: None,
+    'pg_buffercache': evict_shared_buffers,
+}
+
+
+def run_cold_hook(settings):
+    hook = settings['cold_hook']
+    if callable(hook):
+        hook(settings)
+    elif hook in COLD_HOOKS:
+        COLD_HOOKS[hook](settings)
+    else:
+        subprocess.run(hook, shell=True, check=True)
+
+
+def cold_connection(settings):
+    """Evict caches through the cold hook and open a fresh backend (cold catalog caches too)"""
+    run_cold_hook(settings)
+    conn = connect(settings.get('db_config'))
+    if settings['measurement'] in SESSION_MEASUREMENTS:
+        configure_session(conn, settings)
+    return conn
+
+
+def ensure_connection(conn, settings):
+    """Return conn, or a new configured connection when a cold hook restarted the server"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+        return conn
+    except Exception:
+        print("!! Connection lost, reconnecting")
+        conn = connect(settings.get('db_config'))
+        configure_session(conn, settings)
+        return conn
+
+
+def rollback(conn):
+    """Roll back a failed run; a dead connection (server restart, network drop) is left to ensure_connection"""
+    try:
+        conn.rollback()
+    except psycopg2.Error as e:
+        print(f"!! Rollback failed: {str(e).strip()[:200]}")
+
+
+def relations_in_plan(conn, query):
+    """Relations a plain EXPLAIN of the query touches"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (VERBOSE, FORMAT JSON) {query}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    relations = set()
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if 'Relation Name' in node:
+            relations.add(f'"{node.get("Schema", "public")}"."{node["Relation Name"]}"')
+        nodes.extend(node.get('Plans', []))
+    return sorted(relations)
+
+
+def warm_up(conn, query, settings):
+    """Unmeasured executions (and optionally pg_prewarm) before a warm series"""
+    with conn.cursor() as cursor:
+        try:
+            if settings['prewarm'] and is_row_returning(query):
+                for relation in relations_in_plan(conn, query):
+                    cursor.execute("SELECT pg_prewarm(%s::regclass);", (relation,))
+            for _ in range(settings['warmup_runs']):
+                cursor.execute(query)
+        except Exception as e:
+            conn.rollback()
+            print(f"Warm-up stopped: {str(e)[:200]}")
+
+
+def t_quantile(confidence, dof):
+    """Two-sided Student t critical value (Cornish-Fisher expansion, no scipy needed)"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    v = dof
+    return (z
+            + (z**3 + z) / (4 * v)
+            + (5*z**5 + 16*z**3 + 3*z) / (96 * v**2)
+            + (3*z**7 + 19*z**5 + 17*z**3 - 15*z) / (384 * v**3)
+            + (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z) / (92160 * v**4))
+
+
+def relative_precision(tiempos, confidence=SETTINGS['confidence']):
+    """Half width of the confidence interval of the mean relative to the mean"""
+    if len(tiempos) < 2 or mean(tiempos) <= 0:
+        return None
+    half_width = t_quantile(confidence, len(tiempos) - 1) * stdev(tiempos) / sqrt(len(tiempos))
+    return half_width / mean(tiempos)
+
+
+def _precise_enough(results, settings):
+    tiempos = [r for r in results if isinstance(r, float)]
+    if len(tiempos) < max(settings['min_runs'], 3):
+        return False
+    precision = relative_precision(tiempos, settings['confidence'])
+    return precision is not None and precision <= settings['target_precision']
+
+
+def _adaptive_exhausted(results, settings, deadline):
+    """min_runs attempts without a success, or no time left for a run that may last the whole timeout"""
+    if len(results) >= settings['min_runs'] and not any(isinstance(r, float) for r in results):
+        return True
+    return bool(results) and time.perf_counter() + settings['timeout_ms'] / 1000 > deadline
+
+
+def benchmark_query(query, conn, settings=None, previous=None, on_result=None, on_explain=None):
+    """Execute query settings['runs'] times and return the elapsed times or error types
+
+    In the SESSION_MEASUREMENTS the caller is expected to have called
+    configure_session() on conn beforehand. The 'prepared' measurement PREPAREs
+    the query first and times EXECUTE, so run 1 is the first execution (plan +
+    run) and the following runs are the steady state. With settings['stop_on_error'] the
+    series stops after the first deterministic error, and with
+    settings['max_timeouts'] after that many consecutive timeouts; the runs left
+    are recorded as SKIPPED.
+
+    With settings['adaptive'] the number of runs is not fixed: the query is
+    repeated until the relative confidence interval of the mean drops under
+    settings['target_precision'], or max_runs / max_seconds is reached. A run
+    only starts when it would end before max_seconds even if it hit the
+    timeout (the first run always starts), and the series stops after a
+    deterministic error or after min_runs attempts without a success.
+
+    previous holds the results of runs already executed (e.g. restored from a
+    checkpoint), which the series continues; on_result(run_index, result) is
+    called for every new entry, including the SKIPPED padding.
+
+    With settings['explain'] == 'each', every successful run is followed
+    (outside the timed window) by an EXPLAIN (ANALYZE, BUFFERS) execution whose
+    metrics are passed to on_explain(run_index, explain).
+
+    settings['cache_mode'] 'warm' (or 'both') runs warmup_runs unmeasured
+    executions first, optionally after pg_prewarm of the touched relations;
+    'cold' runs the cold hook and opens a fresh connection before every run.
+
+    settings['client_timeout_ms'] bounds every run (execution and result
+    transfer) on the client; runs cancelled by it are recorded as CLIENT_TIMEOUT.
+    A run that loses the connection is recorded as an error and the series
+    continues on a new connection (see ensure_connection).
+    """
+    settings = {**SETTINGS, **(settings or {})}
+    run_once = MEASUREMENTS[settings['measurement']]
+    prepare = PREPARATIONS.get(settings['measurement'])
+    adaptive = settings['adaptive']
+    max_runs = settings['max_runs'] if adaptive else settings['runs']
+    deadline = time.perf_counter() + settings['max_seconds'] if adaptive else None
+    results = list(previous or [])
+    consecutive_timeouts = 0
+    while consecutive_timeouts < len(results) and results[-1 - consecutive_timeouts] in TIMEOUTS:
+        consecutive_timeouts += 1
+
+    def append(result):
+        results.append(result)
+        if on_result:
+            on_result(len(results), result)
+
+    cold = settings['cache_mode'] == 'cold'
+    if settings['cache_mode'] in ('warm', 'both') and len(results) < max_runs:
+        warm_up(conn, query, settings)
+
+    while len(results) < max_runs:
+        if adaptive and (_precise_enough(results, settings) or _adaptive_exhausted(results, settings, deadline)):
+            break
+        run_conn = cold_connection(settings) if cold else conn
+        cursor = run_conn.cursor()
+        try:
+            if prepare:
+                prepare(cursor, query, settings)
+                prepare = PREPARATIONS.get(settings['measurement']) if cold else None
+            with Watchdog(run_conn, settings['client_timeout_ms']):
+                result = run_once(cursor, query, settings)
+            append(result)
+            consecutive_timeouts = 0
+            if settings['explain'] == 'each' and on_explain and is_row_returning(query):
+                on_explain(len(results), explain_analyze(run_conn, query))
+        except Exception as e:
+            rollback(run_conn)
+            error_type = classify_error(e)
+            append(error_type)
+            print(f"Error ({error_type}) en consulta: {str(e)[:200]}...")
+            if (settings['stop_on_error'] or adaptive) and is_deterministic_error(e):
+                break
+            consecutive_timeouts = consecutive_timeouts + 1 if error_type in TIMEOUTS else 0
+            if settings['max_timeouts'] and consecutive_timeouts >= settings['max_timeouts']:
+                break
+        finally:
+            cursor.close()
+            if cold:
+                run_conn.close()
+            elif conn.closed and len(results) < max_runs:
+                # the run lost the connection: continue on a new one, where nothing is prepared yet
+                conn = ensure_connection(conn, settings)
+                prepare = PREPARATIONS.get(settings['measurement'])
+
+    if not adaptive:
+        while len(results) < settings['runs']:
+            append(SKIPPED)
+    return results
+
+
+def summarize(results, confidence=SETTINGS['confidence']):
+    """Mean, standard deviation and relative CI precision over the numeric runs"""
+    tiempos_validos = [r for r in results if isinstance(r, float)]
+    precision = relative_precision(tiempos_validos, confidence)
+    return {
+        'promedio': round(mean(tiempos_validos), 4) if tiempos_validos else 'N/A',
+        'desviacion': round(stdev(tiempos_validos), 4) if len(tiempos_validos) > 1 else 'N/A',
+        'precision': round(precision, 4) if precision is not None else 'N/A'
+    }
+
+
+EXPLAIN_COLUMNS = ['Planning Time', 'Execution Time', 'Shared Hit Blocks', 'Shared Read Blocks']
+
+
+def results_header(runs, settings=None):
+    settings = {**SETTINGS, **(settings or {})}
+    return (['Model', 'NLQ', 'Query Number']
+            + [f'Execution {i}' for i in range(1, runs + 1)]
+            + ['Promedio', 'Desviación', 'Precisión', 'Overhead', 'Fingerprint', 'Shared From']
+            + extra_columns(settings))
+
+
+PREPARED_COLUMNS = ['First Execution', 'Steady State']
+CACHE_COLUMNS = ['Warm Median', 'Cold Median']
+
+
+def extra_columns(settings):
+    """Optional summary columns enabled by the measurement settings"""
+    columns = []
+    if settings['measurement'] == 'prepared':
+        columns += PREPARED_COLUMNS
+    if settings['explain'] != 'off':
+        columns += EXPLAIN_COLUMNS
+    if settings['cache_mode'] != 'mixed':
+        columns += CACHE_COLUMNS
+    if settings['timeout_multiplier']:
+        columns.append(TIMEOUT_COLUMN)
+    if settings['validate']:
+        columns.append(VALIDATION_COLUMN)
+    if settings['max_cost'] or settings['max_rows']:
+        columns += BUDGET_COLUMNS
+    return columns
+
+
+def summarize_cache(results, cold_results, cache_mode):
+    """Median of the warm and of the cold series of a cell"""
+    warm = results if cache_mode in ('warm', 'both') else []
+    cold = results if cache_mode == 'cold' else cold_results
+    summary = {}
+    for column, series in (('Warm Median', warm), ('Cold Median', cold)):
+        tiempos = [r for r in series or [] if isinstance(r, float)]
+        summary[column] = round(median(tiempos), 4) if tiempos else 'N/A'
+    return summary
+
+
+def summarize_prepared(results):
+    """First EXECUTE (planning included) versus the median of the cached-plan runs"""
+    steady = [r for r in results[1:] if isinstance(r, float)]
+    return {
+        'First Execution': results[0] if results and isinstance(results[0], float) else 'N/A',
+        'Steady State': round(median(steady), 4) if steady else 'N/A',
+    }
+
+
+def execution_columns(settings):
+    """Number of Execution columns written for the configured run policy"""
+    return settings['max_runs'] if settings['adaptive'] else settings['runs']
+
+
+def nlq_id(nlq):
+    """'4 - Have any of them wandered off...' -> '4'"""
+    return str(nlq).split(' - ')[0]
+
+
+def run_model(model, conn, writer, settings, store=None, shared=None, report=None, references=None,
+              plans=None):
+    """Benchmark every query of one model workbook and append its rows to writer
+
+    With a RunStore, cells already finished are reused as they are and
+    interrupted cells only execute their missing runs. shared maps
+    (SQL fingerprint, timeout) to the runs and capture of the first cell that
+    executed that statement, so equivalent statements of any model are executed
+    only once. When report is a list, each cell gets one untimed capture run
+    (row count, result hash and preview) after its timed runs (with the async
+    backend, after the whole model), whose row is appended to it with the
+    Execution Accuracy verdict against references (NLQ id -> fingerprint).
+    Statements rejected by validation or over budget are not captured either.
+    EXPLAIN ANALYZE metrics of each run are written to the plans csv writer.
+    Each cell runs with its query_timeout. With settings['validate'] a
+    statement rejected by validate_query skips its timed runs, and with
+    settings['max_cost'] / settings['max_rows'] so does (or, with
+    over_budget 'once', runs a single time) a statement whose plain EXPLAIN
+    estimates exceed the budget. With settings['warehouse'] the runs, cells and
+    plans are also appended to the results warehouse, flushed once per model.
+    """
+    name, workbook = resolve_workbook(model)
+    timeout_ms = settings.get('model_timeouts', {}).get(name, settings['timeout_ms'])
+    settings = {**settings, 'timeout_ms': timeout_ms}
+    if name == REFERENCE_DIR:
+        settings['timeout_multiplier'] = None
+
+    print(f"\n{'='*60}")
+    print(f" Starting benchmark for: {name.upper()} (timeout {timeout_ms} ms)")
+    print(f"{'='*60}\n")
+
+    try:
+        queries = list(load_queries(workbook, settings['max_query']))
+    except Exception as e:
+        print(f"!! ERROR in file reading: {e}")
+        return 0
+
+    overhead = 'N/A'
+    shared_conn = conn
+    if settings['cache_mode'] in ('cold', 'both') or conn.closed:
+        conn = ensure_connection(conn, settings)
+    session = settings['measurement'] in SESSION_MEASUREMENTS or report is not None
+    if session:
+        configure_session(conn, settings)
+    session_timeout = settings['timeout_ms']
+    if settings['measurement'] in SESSION_MEASUREMENTS:
+        overhead = calibrate_overhead(conn)
+        print(f"Round-trip overhead (SELECT 1 median): {overhead} s")
+
+    if shared is None:
+        shared = {}
+    warehouse = settings.get('warehouse')
+    model_settings = settings
+    cells = []
+    for nlq, q_num, query in queries:
+        settings = {**model_settings, 'timeout_ms': query_timeout(nlq, model_settings)}
+        if session and settings['timeout_ms'] != session_timeout:
+            configure_session(conn, settings)
+            session_timeout = settings['timeout_ms']
+        key = (name, str(nlq), f'Q{q_num}')
+        sql_key = (fingerprint(query), settings['timeout_ms'])
+        entry = shared.get(sql_key) if settings['dedup'] else None
+        shared_from = entry['source'] if entry else ''
+        capture = entry.get('capture') if entry else None
+        explains = list(entry.get('explains', [])) if entry else []
+        cold_results = entry.get('cold') if entry else None
+        validation = entry.get('validation', 'N/A') if entry else 'N/A'
+        estimate = dict(entry.get('estimate', {})) if entry else {}
+        budget = entry.get('budget', 'N/A') if entry else 'N/A'
+
+        previous = store.completed(key) if store else []
+        if store and store.is_done(key):
+            print(f"Checkpoint {name} | NLQ: {nlq} | Query Q{q_num}")
+            resultados = previous
+        elif entry:
+            resultados = entry['results']
+            print(f"Shared {name} | NLQ: {nlq} | Query Q{q_num} <- {shared_from}")
+            if store:
+                for run_index, result in enumerate(resultados[len(previous):], len(previous) + 1):
+                    store.record(key, run_index, result)
+                store.mark_done(key)
+        else:
+            print(f"Ejecutando {name} | NLQ: {nlq} | Query Q{q_num}"
+                  + (f" (resuming after run {len(previous)})" if previous else ""))
+            on_result = (lambda run_index, result, key=key: store.record(key, run_index, result)) \
+                if store else None
+
+            def on_explain(run_index, explain, key=key):
+                explains.append(explain)
+                if plans and explain:
+                    plans.writerow([*key, run_index, *(explain[c] for c in EXPLAIN_COLUMNS), explain['Plan']])
+                if warehouse and explain:
+                    warehouse.add_plan(*key, run_index, explain)
+
+            rejected = None
+            if settings['validate']:
+                rejected = validate_query(conn, query, estimate)
+                validation = rejected['Validation'] if rejected else VALID
+            elif settings['max_cost'] or settings['max_rows']:
+                estimate = estimate_query(conn, query)
+            if estimate and not rejected:
+                budget = OVER_BUDGET if over_budget(estimate, settings) else 'OK'
+            if rejected:
+                print(f"Rejected ({rejected['Validation']}): {rejected['Message'][:200]}")
+                resultados = rejected_series(rejected['Error'], settings, previous, on_result)
+                if capture is None:
+                    capture = unexecuted_capture(rejected['Error'], rejected['Message'], settings['preview_chars'])
+            elif budget == OVER_BUDGET:
+                print(f"{OVER_BUDGET} (cost {estimate['Estimated Cost']}, rows {estimate['Estimated Rows']}): "
+                      + ("single run" if settings['over_budget'] == 'once' else "not executed"))
+                if settings['over_budget'] == 'once':
+                    previous = benchmark_query(query, conn, {**settings, 'adaptive': False,
+                                                             'runs': max(len(previous), 1)},
+                                               previous, on_result, on_explain)
+                elif capture is None:
+                    capture = unexecuted_capture(OVER_BUDGET, f"{OVER_BUDGET} (cost {estimate['Estimated Cost']}, "
+                                                 f"rows {estimate['Estimated Rows']}), not executed",
+                                                 settings['preview_chars'])
+                resultados = rejected_series(OVER_BUDGET, settings, previous, on_result)
+                rejected = True
+            else:
+                resultados = benchmark_query(query, conn, settings, previous, on_result, on_explain)
+            if settings['cache_mode'] == 'both' and not rejected:
+                cold_results = benchmark_query(query, conn, {**settings, 'cache_mode': 'cold', 'adaptive': False,
+                                                             'runs': settings['cold_runs'], 'explain': 'off'})
+            if settings['cache_mode'] in ('cold', 'both') or conn.closed:
+                conn = ensure_connection(conn, settings)
+                session_timeout = settings['timeout_ms']
+            if settings['explain'] == 'once' and is_row_returning(query) and not rejected:
+                on_explain('once', explain_analyze(conn, query))
+            if store:
+                store.mark_done(key)
+        # after the timed runs, so the first run still finds the buffers the way the series left them
+        if report is not None and capture is None and settings['backend'] != 'async':
+            capture = capture_result(conn, query, settings['preview_chars'], settings)
+        if settings['dedup'] and not entry:
+            shared[sql_key] = {'results': resultados, 'capture': capture, 'explains': explains,
+                               'cold': cold_results, 'validation': validation,
+                               'estimate': estimate, 'budget': budget,
+                               'source': f'{name}:{nlq_id(nlq)}:Q{q_num}'}
+        extras = summarize_explains(explains) if settings['explain'] != 'off' else {}
+        if settings['measurement'] == 'prepared':
+            extras.update(summarize_prepared(resultados))
+        if settings['cache_mode'] != 'mixed':
+            extras.update(summarize_cache(resultados, cold_results, settings['cache_mode']))
+        extras[TIMEOUT_COLUMN] = settings['timeout_ms']
+        extras[VALIDATION_COLUMN] = validation
+        extras.update(estimate, Budget=budget)
+
+        stats = summarize(resultados, settings['confidence'])
+        padding = [''] * (execution_columns(settings) - len(resultados))
+        writer.writerow([
+            name,
+            nlq,
+            f'Q{q_num}',
+            *resultados,
+            *padding,
+            stats['promedio'],
+            stats['desviacion'],
+            stats['precision'],
+            overhead,
+            sql_key[0],
+            shared_from,
+            *(extras.get(column, 'N/A') for column in extra_columns(settings))
+        ])
+        cells.append((nlq, q_num, query, settings, sql_key, shared_from, resultados, stats, capture,
+                      validation, estimate, budget))
+
+    captures = {}
+    if report is not None and model_settings['backend'] == 'async':
+        captures = prefetch_captures(cells, shared, model_settings)
+    for nlq, q_num, query, settings, sql_key, shared_from, resultados, stats, capture, \
+            validation, estimate, budget in cells:
+        if report is not None and capture is None:
+            capture = captures[sql_key]
+        accuracy = None
+        if report is not None:
+            accuracy = verdict(capture['Multiset'], (references or {}).get(nlq_id(nlq)), capture['Failed'])
+            report_row = {
+                'NLQ': nlq_id(nlq),
+                'Query': f'Q{q_num}',
+                'SQL': query,
+                'Result': capture['Result'],
+                'Characters Returned': len(capture['Result']) if not capture['Result'].startswith('Error') else 0,
+                'Rows': capture['Rows'],
+                'Result Hash': capture['Result Hash'],
+                'Fingerprint': sql_key[0],
+                'Result ID': capture.get('Result ID', ''),
+                'Execution Accuracy': accuracy
+            }
+            if settings['diff_rows'] and accuracy == INCORRECT:
+                # the capture is shared by equivalent cells, so is its diff per reference
+                diffs = capture.setdefault('Diffs', {})
+                if nlq_id(nlq) not in diffs:
+                    diffs[nlq_id(nlq)] = mismatch_diff(conn, query, nlq, settings)
+                report_row['Row Diff'] = diffs[nlq_id(nlq)]
+            report.append(report_row)
+            if settings.get('result_store'):
+                settings['result_store'].record((name, nlq_id(nlq), f'Q{q_num}'), capture.get('Result ID'),
+                                                capture['Rows'], capture['Status'])
+        if warehouse:
+            warehouse.add_runs(name, nlq, f'Q{q_num}', resultados, settings)
+            warehouse.add_cell(name, nlq, f'Q{q_num}', resultados, stats, fingerprint=sql_key[0],
+                               shared_from=shared_from, validation=validation,
+                               estimated_cost=estimate.get('Estimated Cost'),
+                               estimated_rows=estimate.get('Estimated Rows'), budget=budget,
+                               rows=capture['Rows'] if capture else None,
+                               result_hash=capture['Result Hash'] if capture else None,
+                               result_id=capture.get('Result ID') if capture else None,
+                               execution_accuracy=accuracy)
+    if warehouse:
+        warehouse.flush()
+    if conn is not shared_conn:
+        conn.close()
+    return len(queries)
+
+
+def prefetch_captures(cells, shared, settings):
+    """Capture the distinct statements of a model's timed cells concurrently with the async backend
+
+    Runs once the whole model has been timed, and also fills the captures of
+    the shared entries so later models reuse them.
+    """
+    from async_backend import capture_many
+
+    pending = {}
+    for _, _, query, _, sql_key, _, _, _, capture, *_ in cells:
+        entry = shared.get(sql_key) if settings['dedup'] else None
+        if capture is None and not (entry and entry.get('capture')):
+            pending.setdefault(sql_key, query)
+    print(f"Capturing {len(pending)} statements with {settings['concurrency']} concurrent connections")
+    captures = {}
+    for timeout_ms in sorted({timeout_ms for _, timeout_ms in pending}):
+        group = [sql_key for sql_key in pending if sql_key[1] == timeout_ms]
+        results = capture_many([pending[sql_key] for sql_key in group], settings['db_config'],
+                               {**settings, 'timeout_ms': timeout_ms}, settings['concurrency'])
+        captures.update(zip(group, results))
+    for sql_key, capture in captures.items():
+        if sql_key in shared:
+            shared[sql_key]['capture'] = capture
+    return captures
+
+
+def write_validation_report(path, reports):
+    """One sheet per model, same layout as LLM_Validation_Report.xlsx"""
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, rows in reports.items():
+            df_results = pd.DataFrame(rows)
+            sheet_name = name[:31]
+            df_results.to_excel(writer, sheet_name=sheet_name, index=False)
+            if 'Execution Accuracy' not in df_results.columns:
+                worksheet = writer.sheets[sheet_name]
+                worksheet.cell(row=1, column=df_results.shape[1]+1, value="Execution Accuracy")
+
+
+def run_benchmark(models, settings=None, db_config=None):
+    """Benchmark several models in one process over a shared connection"""
+    settings = {**SETTINGS, 'model_timeouts': MODEL_TIMEOUTS, **(settings or {}),
+                'db_config': db_config or DB_CONFIG}
+    start_total = datetime.now()
+    checkpoint = settings.get('checkpoint') or os.path.splitext(settings['output'])[0] + '_checkpoint.csv'
+    report_path = settings.get('report') or os.path.splitext(settings['output'])[0] + '_validation.xlsx'
+    store = RunStore(checkpoint, resume=settings.get('resume', False))
+    if settings['timeout_multiplier']:
+        settings['reference_medians'] = load_reference_medians(settings['reference_times'])
+        print(f"Per-NLQ timeouts: {settings['timeout_multiplier']:g} x reference median, "
+              f"floor {settings['timeout_floor_ms']} ms")
+    conn = connect(db_config)
+    if settings['cache_mode'] in ('cold', 'both') and settings['cold_hook'] == 'pg_buffercache' \
+            and not buffercache_available(conn):
+        print("!! pg_buffercache_evict() is not available (needs PostgreSQL 17+ and CREATE EXTENSION "
+              "pg_buffercache); cold runs will only reconnect, as with --cold-hook none")
+        settings['cold_hook'] = 'none'
+    total_queries = 0
+    shared = {}
+    reports = {}
+    references = None
+    plans_file = plans = None
+    if settings['explain'] != 'off':
+        plans_path = os.path.splitext(settings['output'])[0] + '_plans.csv'
+        append = settings.get('resume', False) and os.path.exists(plans_path)
+        plans_file = open(plans_path, 'a' if append else 'w', newline='', encoding='utf-8')
+        plans = csv.writer(plans_file)
+        if not append:
+            plans.writerow(['Model', 'NLQ', 'Query Number', 'Run', *EXPLAIN_COLUMNS, 'Plan'])
+    if settings['capture']:
+        references = load_references(settings['reference_dir'], settings['column_permutation'],
+                                     settings['numeric_digits'])
+        print(f"Reference outputs loaded for NLQs: {', '.join(sorted(references, key=int)) or 'none'}")
+    if settings['capture'] and settings['store_dir']:
+        settings['result_store'] = ResultStore(settings['store_dir'])
+    if settings['warehouse_dir']:
+        settings['warehouse'] = Warehouse(settings['warehouse_dir'])
+    # every capture of every model reads the data as of one exported snapshot
+    coordinator = connect(db_config) if settings['capture'] and settings['snapshot'] else None
+    try:
+        with ExportedSnapshot(coordinator) if coordinator else nullcontext() as snapshot_id:
+            if snapshot_id:
+                settings['snapshot_id'] = snapshot_id
+                print(f"Captures pinned to snapshot {snapshot_id}")
+            with open(settings['output'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(results_header(execution_columns(settings), settings))
+                for model in models:
+                    report = reports.setdefault(resolve_workbook(model)[0], []) if settings['capture'] else None
+                    total_queries += run_model(model, conn, writer, settings, store, shared, report,
+                                               references, plans)
+                    f.flush()
+    finally:
+        if coordinator:
+            coordinator.close()
+        if settings.get('result_store'):
+            settings['result_store'].close()
+        if settings.get('warehouse'):
+            settings['warehouse'].close()
+        conn.close()
+        store.close()
+        if plans_file:
+            plans_file.close()
+    if settings['capture']:
+        write_validation_report(report_path, reports)
+
+    total_time = datetime.now() - start_total
+    print(f"\n{'#'*60}")
+    print(f" BENCHMARK COMPLETED: {len(models)} models, {total_queries} queries"
+          + (f", {len(shared)} distinct statements" if settings['dedup'] else ""))
+    print(f" Output: {settings['output']} (checkpoint: {checkpoint})")
+    if settings['capture']:
+        print(f" Validation report: {report_path}")
+    print(f" Total time: {total_time.total_seconds():.2f} seconds")
+    print(f"{'#'*60}")
+    return total_queries
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the LLM generated SQL of several models')
+    parser.add_argument('models', nargs='*',
+                        help='Model folders or *-Evaluation.xlsx workbooks (default: auto-discover)')
+    parser.add_argument('--root', default='.', help='Folder searched when auto-discovering models')
+    parser.add_argument('--include-reference', action='store_true',
+                        help='Also benchmark the ReferenceQueries workbook when auto-discovering')
+    parser.add_argument('-o', '--output', default=SETTINGS['output'], help='Consolidated CSV output')
+    parser.add_argument('--report', default=None,
+                        help='Validation report written from the capture runs (default: <output>_validation.xlsx)')
+    parser.add_argument('--no-capture', dest='capture', action='store_false',
+                        help='Skip the untimed capture run and the validation report')
+    parser.add_argument('--reference-dir', default=SETTINGS['reference_dir'],
+                        help='Folder with the Q<NLQ>-Output.csv reference results used for Execution Accuracy')
+    parser.add_argument('--column-permutation', action='store_true',
+                        help='Accept results whose columns come in a different order than the reference')
+    parser.add_argument('--numeric-digits', type=int, default=SETTINGS['numeric_digits'],
+                        help='Decimal places numbers are rounded to before comparing results')
+    parser.add_argument('--store', dest='store_dir', default=SETTINGS['store_dir'],
+                        help='Keep every captured result set in this content-addressed store (result_store.py)')
+    parser.add_argument('--warehouse', dest='warehouse_dir', default=SETTINGS['warehouse_dir'],
+                        help='Also append runs, cells and plans to this Parquet warehouse (results_warehouse.py)')
+    parser.add_argument('--diff-rows', type=int, default=SETTINGS['diff_rows'],
+                        help='Re-run Incorrect captures and report up to this many missing/extra rows')
+    parser.add_argument('--diff-memory-mb', type=int, default=SETTINGS['diff_memory_mb'],
+                        help='Memory (MB) used by the external sort of --diff-rows')
+    parser.add_argument('--backend', choices=['sync', 'async'], default=SETTINGS['backend'],
+                        help="'async' runs the untimed capture runs concurrently over psycopg 3")
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Run every capture in REPEATABLE READ READ ONLY on one exported snapshot')
+    parser.add_argument('--concurrency', type=int, default=SETTINGS['concurrency'],
+                        help='Statements in flight with the async backend')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Per-run checkpoint CSV (default: <output>_checkpoint.csv)')
+    parser.add_argument('--resume', '--only-missing', dest='resume', action='store_true',
+                        help='Reuse the checkpoint and only execute the runs that are missing')
+    parser.add_argument('--runs', type=int, default=SETTINGS['runs'])
+    parser.add_argument('--timeout-ms', type=int, default=None,
+                        help='statement_timeout for every model (overrides the per-model defaults)')
+    parser.add_argument('--validate', action='store_true',
+                        help='parse and EXPLAIN each statement first; rejected statements skip the timed runs')
+    parser.add_argument('--max-cost', type=float, default=SETTINGS['max_cost'],
+                        help='planner cost budget from a plain EXPLAIN; costlier statements are over budget')
+    parser.add_argument('--max-rows', type=float, default=SETTINGS['max_rows'],
+                        help='budget on the rows the planner estimates for the result')
+    parser.add_argument('--over-budget', choices=['skip', 'once'], default=SETTINGS['over_budget'],
+                        help="'skip' records Over budget without running, 'once' runs the statement a single time")
+    parser.add_argument('--client-timeout-ms', type=int, default=SETTINGS['client_timeout_ms'],
+                        help='wall-clock deadline over execute and fetch, enforced by cancelling from the client')
+    parser.add_argument('--timeout-multiplier', type=float, default=SETTINGS['timeout_multiplier'],
+                        help='per-NLQ statement_timeout as this multiple of the reference query median, '
+                             'capped by the model timeout')
+    parser.add_argument('--timeout-floor-ms', type=int, default=SETTINGS['timeout_floor_ms'])
+    parser.add_argument('--reference-times', default=SETTINGS['reference_times'],
+                        help='reference timings csv used by --timeout-multiplier')
+    parser.add_argument('--lock-timeout', default=SETTINGS['lock_timeout'])
+    parser.add_argument('--measurement', choices=sorted(MEASUREMENTS), default=SETTINGS['measurement'],
+                        help="'legacy' reproduces the published timings; 'isolated' configures the session "
+                             "once, resets state outside the timed window and reports the SELECT 1 overhead; "
+                             "'prepared' times EXECUTE of a prepared statement (first vs steady state)")
+    parser.add_argument('--transport', choices=['separate', 'batched'], default=SETTINGS['transport'],
+                        help="'batched' sends the per-run setup of the legacy measurement as one round trip")
+    parser.add_argument('--explain', choices=['off', 'once', 'each'], default=SETTINGS['explain'],
+                        help='Also record EXPLAIN (ANALYZE, BUFFERS) planning/execution time, buffers and plan '
+                             'once per query or after each run (outside the timed window)')
+    parser.add_argument('--cache-mode', choices=['mixed', 'warm', 'cold', 'both'], default=SETTINGS['cache_mode'],
+                        help="'warm' adds unmeasured warm-up runs, 'cold' evicts caches and reconnects before "
+                             "every run, 'both' adds --cold-runs cold runs to a warm series")
+    parser.add_argument('--warmup-runs', type=int, default=SETTINGS['warmup_runs'])
+    parser.add_argument('--prewarm', action='store_true',
+                        help='pg_prewarm the relations of each query before its warm series')
+    parser.add_argument('--cold-hook', default=SETTINGS['cold_hook'],
+                        help="Cache eviction before cold runs: 'pg_buffercache', 'none' or a shell command "
+                             "(only for a local disposable server)")
+    parser.add_argument('--cold-runs', type=int, default=SETTINGS['cold_runs'])
+    parser.add_argument('--stop-on-error', action='store_true',
+                        help='Skip the remaining runs after a deterministic error (syntax, missing relation...)')
+    parser.add_argument('--max-timeouts', type=int, default=SETTINGS['max_timeouts'],
+                        help='Skip the remaining runs after this many consecutive timeouts (0 disables)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Repeat each query until the relative CI of its mean is under --target-precision')
+    parser.add_argument('--target-precision', type=float, default=SETTINGS['target_precision'],
+                        help='Relative half width of the CI of the mean (0.05 = +/-5%%)')
+    parser.add_argument('--confidence', type=float, default=SETTINGS['confidence'])
+    parser.add_argument('--min-runs', type=int, default=SETTINGS['min_runs'])
+    parser.add_argument('--max-runs', type=int, default=SETTINGS['max_runs'])
+    parser.add_argument('--max-seconds', type=float, default=SETTINGS['max_seconds'],
+                        help='Time budget per query in adaptive mode')
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false',
+                        help='Execute every cell even when its SQL is equivalent to an earlier one')
+    parser.add_argument('--max-query', type=int, default=SETTINGS['max_query'],
+                        help='Highest Q column read from the workbooks')
+    for key, value in DB_CONFIG.items():
+        parser.add_argument(f'--{key}', default=value)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    models = args.models or discover_models(args.root, args.include_reference)
+    if not models:
+        print(f"!! No *{WORKBOOK_SUFFIX} workbooks found under {args.root}")
+        return
+    settings = {
+        'runs': args.runs,
+        'lock_timeout': args.lock_timeout,
+        'max_query': args.max_query,
+        'measurement': args.measurement,
+        'transport': args.transport,
+        'explain': args.explain,
+        'validate': args.validate,
+        'client_timeout_ms': args.client_timeout_ms,
+        'max_cost': args.max_cost,
+        'max_rows': args.max_rows,
+        'over_budget': args.over_budget,
+        'timeout_multiplier': args.timeout_multiplier,
+        'timeout_floor_ms': args.timeout_floor_ms,
+        'reference_times': args.reference_times,
+        'cache_mode': args.cache_mode,
+        'warmup_runs': args.warmup_runs,
+        'prewarm': args.prewarm,
+        'cold_hook': args.cold_hook,
+        'cold_runs': args.cold_runs,
+        'stop_on_error': args.stop_on_error,
+        'max_timeouts': args.max_timeouts,
+        'adaptive': args.adaptive,
+        'target_precision': args.target_precision,
+        'confidence': args.confidence,
+        'min_runs': args.min_runs,
+        'max_runs': args.max_runs,
+        'max_seconds': args.max_seconds,
+        'output': args.output,
+        'dedup': args.dedup,
+        'capture': args.capture,
+        'report': args.report,
+        'reference_dir': args.reference_dir,
+        'column_permutation': args.column_permutation,
+        'numeric_digits': args.numeric_digits,
+        'store_dir': args.store_dir,
+        'warehouse_dir': args.warehouse_dir,
+        'diff_rows': args.diff_rows,
+        'diff_memory_mb': args.diff_memory_mb,
+        'backend': args.backend,
+        'concurrency': args.concurrency,
+        'snapshot': args.snapshot,
+        'checkpoint': args.checkpoint,
+        'resume': args.resume,
+    }
+    if args.timeout_ms is not None:
+        settings['timeout_ms'] = args.timeout_ms
+        settings['model_timeouts'] = {}
+    db_config = {key: getattr(args, key) for key in DB_CONFIG}
+    run_benchmark(models, settings, db_config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Automatic Execution Accuracy (EX) against the reference query outputs.
+
+Result sets are reduced to order-insensitive multiset fingerprints: each row
+is normalized (numbers rounded, timestamps/booleans/arrays written the same way
+PostgreSQL exports them), hashed, and the row hashes are added modulo 2**128.
+Both the generated result (while it is streamed from the server) and the
+reference ReferenceQueries&Outputs/Q<NLQ>-Output.csv are fingerprinted row by
+row, so large outputs such as Q9 are compared without loading either side.
+"""
+import csv
+import datetime
+import decimal
+import glob
+import hashlib
+import os
+import re
+
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'ReferenceQueries', 'ReferenceQueries&Outputs')
+NUMERIC_DIGITS = 6
+
+CORRECT = 'Correct'
+INCORRECT = 'Incorrect'
+ERROR = 'Error'
+NO_REFERENCE = 'No reference'
+
+NUMBER_RE = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2}(?:\.\d+)?)(Z|[+-]00(?::?00)?)?$')
+MODULUS = 2 ** 128
+
+
+def _number(value, digits):
+    value = round(float(value), digits)
+    if value == 0:
+        value = 0.0
+    return format(value, f'.{digits}f').rstrip('0').rstrip('.')
+
+
+def normalize_value(value, digits=NUMERIC_DIGITS):
+    """Canonical text of a value, whether it comes from psycopg2 or from a CSV cell"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return _number(value, digits)
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(normalize_value(v, digits) for v in value) + '}'
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        value = value.isoformat()
+    text = str(value).strip()
+    lowered = text.lower()
+    if lowered in ('true', 't'):
+        return 'true'
+    if lowered in ('false', 'f'):
+        return 'false'
+    if NUMBER_RE.match(text):
+        return _number(text, digits)
+    match = TIMESTAMP_RE.match(text)
+    if match:
+        return f'{match.group(1)}T{match.group(2)}'
+    return text
+
+
+def normalize_row(row, column_permutation=False, digits=NUMERIC_DIGITS):
+    """Normalized values of a row; sorted when column order does not matter"""
+    values = [normalize_value(v, digits) for v in row]
+    return sorted(values) if column_permutation else values
+
+
+class MultisetFingerprint:
+    """Order-insensitive fingerprint of a stream of rows"""
+
+    def __init__(self, column_permutation=False, digits=NUMERIC_DIGITS):
+        self.column_permutation = column_permutation
+        self.digits = digits
+        self.rows = 0
+        self.total = 0
+
+    def row_values(self, row):
+        return normalize_row(row, self.column_permutation, self.digits)
+
+    def add_row(self, row):
+        digest = hashlib.sha1('\x1f'.join(self.row_values(row)).encode('utf-8')).digest()
+        self.total = (self.total + int.from_bytes(digest[:16], 'big')) % MODULUS
+        self.rows += 1
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.add_row(row)
+
+    @property
+    def key(self):
+        return (self.rows, self.total)
+
+    def __eq__(self, other):
+        return isinstance(other, MultisetFingerprint) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+def fingerprint_csv(path, column_permutation=False, digits=NUMERIC_DIGITS):
+    """Stream a reference output CSV (with header) into a MultisetFingerprint"""
+    fp = MultisetFingerprint(column_permutation, digits)
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            fp.add_row(row)
+    return fp
+
+
+def load_references(reference_dir=REFERENCE_DIR, column_permutation=False, digits=NUMERIC_DIGITS):
+    """Map NLQ id ('1', '2', ...) to the fingerprint of Q<id>-Output.csv"""
+    references = {}
+    for path in glob.glob(os.path.join(glob.escape(reference_dir), 'Q*-Output.csv')):
+        nlq = os.path.basename(path)[1:-len('-Output.csv')]
+        references[nlq] = fingerprint_csv(path, column_permutation, digits)
+    return references
+
+
+def verdict(fingerprint, reference, failed=False):
+    """EX verdict of one generated query"""
+    if failed:
+        return ERROR
+    if reference is None:
+        return NO_REFERENCE
+    if fingerprint is None:
+        return INCORRECT
+    return CORRECT if fingerprint == reference else INCORRECT
@@ -0,0 +1,126 @@
+"""Vectorized loader of the <model>_resultados_ejecucion.csv run logs.
+
+The plotting scripts used to parse every Execution cell through a Python
+lambda (converters=) and compute the success rate row by row. Here the
+Execution cells are parsed in one pass of pandas string and numeric
+operations (decimal comma included), failures are kept as a categorical
+status per run next to the float timings, and success rates and timing
+statistics are NumPy reductions over the whole cells x runs matrix.
+
+    df = load_execution_results('GPT-4o_resultados_ejecucion.csv')
+
+adds, for every Execution i column (seconds, NaN when the run failed or did
+not happen), a categorical Status i column ('OK', 'Timeout', ...), plus
+NLQ_ID, Runs, Successes, Success Rate, Mean Time, Median Time and Std Time.
+"""
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from query_watchdog import CLIENT_TIMEOUT
+
+
+RUNS = 10
+OK = 'OK'
+# Labels written by the benchmark engine in the Execution columns; any other text is kept as its own category
+STATUSES = [OK, 'Timeout', CLIENT_TIMEOUT, 'Error de sintaxis', 'Error en ejecución', 'Skipped', 'Over budget']
+EXECUTION_COLUMN = re.compile(r'^Execution (\d+)$')
+
+
+def execution_columns(df, runs=RUNS):
+    """Execution 1..N column names, N being the highest present and at least runs"""
+    present = [int(m.group(1)) for m in map(EXECUTION_COLUMN.match, map(str, df.columns)) if m]
+    return [f'Execution {i}' for i in range(1, max([runs, *present]) + 1)]
+
+
+def parse_executions(df, runs=RUNS):
+    """Timings (cells x runs float matrix) and statuses of the Execution columns of df
+
+    Cells may be numbers, decimal-comma text or status labels; empty cells are
+    runs that did not happen and get no status.
+    """
+    columns = execution_columns(df, runs)
+    cells = df.reindex(columns=columns)
+    shape = cells.shape
+    missing = cells.isna().to_numpy()
+    # one pass over every cell of the matrix, flattened
+    text = pd.Series(cells.to_numpy(dtype=object).astype(str).ravel()).str.strip()
+    times = pd.to_numeric(text.str.replace(',', '.', regex=False), errors='coerce').to_numpy(dtype=float)
+    times = np.where(missing, np.nan, times.reshape(shape))
+    text = text.to_numpy(dtype=object).reshape(shape)
+    statuses = np.where(missing, None, np.where(np.isnan(times), text, OK))
+    labels = pd.unique(statuses[~missing])
+    categories = STATUSES + sorted(set(labels) - set(STATUSES))
+    return columns, times, statuses, categories
+
+
+def summarize_executions(df, runs=RUNS):
+    """df with parsed Execution columns, Status columns and per-row success and timing statistics"""
+    columns, times, statuses, categories = parse_executions(df, runs)
+    df = df.copy()
+    for i, column in enumerate(columns):
+        df[column] = times[:, i]
+        df[f'Status {i + 1}'] = pd.Categorical(statuses[:, i], categories=categories)
+
+    successes = (~np.isnan(times)).sum(axis=1)
+    attempts = (~pd.isna(statuses)).sum(axis=1)
+    df['Runs'] = attempts
+    df['Successes'] = successes
+    df['Success Rate'] = np.divide(successes, attempts, out=np.zeros(len(df)), where=attempts > 0)
+    with warnings.catch_warnings():
+        # rows without any successful run give NaN statistics
+        warnings.simplefilter('ignore', RuntimeWarning)
+        df['Mean Time'] = np.nanmean(times, axis=1)
+        df['Median Time'] = np.nanmedian(times, axis=1)
+        df['Std Time'] = np.nanstd(times, axis=1, ddof=1)
+    if 'NLQ' in df.columns:
+        df['NLQ_ID'] = df['NLQ'].str.extract(r'(\d+) -', expand=False).astype(int)
+    return df
+
+
+def status_counts(df, by=None):
+    """Runs per status (columns) overall or per group of the by column(s), from the categorical codes"""
+    status_columns = [c for c in df.columns if str(c).startswith('Status ')]
+    if not status_columns:
+        return pd.DataFrame()
+    categories = df[status_columns[0]].cat.categories
+    codes = np.stack([df[c].cat.codes.to_numpy() for c in status_columns], axis=1)
+    if by is None:
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        return pd.DataFrame([counts], columns=categories)
+    groups = df.groupby(by, sort=True).indices
+    rows = {key: np.bincount(codes[index][codes[index] >= 0], minlength=len(categories))
+            for key, index in groups.items()}
+    return pd.DataFrame.from_dict(rows, orient='index', columns=categories)
+
+
+def detect_separator(path, encoding='latin-1'):
+    """';' for the published run logs (decimal comma), ',' for the ones Script_Evaluation.py writes"""
+    with open(path, encoding=encoding) as f:
+        return ';' if ';' in f.readline() else ','
+
+
+def read_run_log(path, sep, encoding):
+    """Run log CSV as read by pandas, Execution cells kept as text"""
+    decimal = ',' if sep == ';' else '.'
+    header = pd.read_csv(path, sep=sep, encoding=encoding, nrows=0).columns
+    text_columns = {c: str for c in header if EXECUTION_COLUMN.match(str(c))}
+    return pd.read_csv(path, sep=sep, decimal=decimal, encoding=encoding, dtype=text_columns)
+
+
+def load_execution_results(path, runs=RUNS, sep=None, encoding=None):
+    """Read a run log CSV and summarize it; sep=None detects the ';' / ',' variant
+
+    encoding=None reads the log as UTF-8 (the benchmark engine's logs) and
+    only re-reads it as latin-1 (the published ones) when that fails.
+    """
+    sep = sep or detect_separator(path)
+    if encoding is not None:
+        return summarize_executions(read_run_log(path, sep, encoding), runs)
+    try:
+        df = read_run_log(path, sep, 'utf-8')
+    except UnicodeDecodeError:
+        df = read_run_log(path, sep, 'latin-1')
+    return summarize_executions(df, runs)
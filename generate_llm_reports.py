@@ -1,11 +1,22 @@
 import os
+import argparse
+import threading
 import psycopg2
 import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from psycopg2.pool import ThreadedConnectionPool
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
+from execution_accuracy import CORRECT, REFERENCE_DIR, MultisetFingerprint, load_references, verdict
+from query_watchdog import Watchdog
+from result_capture import ExportedSnapshot, RowFanout, stream_result
+from result_store import ResultStore
+from results_warehouse import Warehouse
+from sql_fingerprint import fingerprint
 
 
 DB_CONFIG = {
@@ -22,6 +33,57 @@ LLM_DIRS = [
     'Ollama_SQLCoder-7B', 'Ollama_SQLCoder-15B'
 ]
 
+# The correctness pass does not measure timing, so queries can run concurrently
+WORKERS = 4
+COOLDOWN = 0
+MAX_ACTIVE_BACKENDS = None
+LOAD_CHECK_INTERVAL = 0.5
+
+# Per-statement timeout of the async backend
+ASYNC_TIMEOUT_MS = 30000
+# Wall-clock deadline (execution and transfer) of each statement on the thread backend
+CLIENT_TIMEOUT_MS = 60000
+
+# Content-addressed store that keeps every captured result set (None: disabled)
+RESULT_STORE_DIR = None
+# Parquet warehouse the captures are also appended to (None: disabled)
+WAREHOUSE_DIR = None
+
+# Execution Accuracy against ReferenceQueries/ReferenceQueries&Outputs
+COLUMN_PERMUTATION = False
+NUMERIC_DIGITS = 6
+
+
+class ServerLoadLimiter:
+    """Hold new queries while the server has too many active backends"""
+
+    def __init__(self, pool, max_active=None, cooldown=0, interval=LOAD_CHECK_INTERVAL):
+        self.pool = pool
+        self.max_active = max_active
+        self.cooldown = cooldown
+        self.interval = interval
+        self.lock = threading.Lock()
+
+    def active_backends(self):
+        conn = self.pool.getconn()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_stat_activity "
+                               "WHERE state = 'active' AND pid <> pg_backend_pid();")
+                return cursor.fetchone()[0]
+        finally:
+            self.pool.putconn(conn)
+
+    def wait(self):
+        if self.cooldown:
+            time.sleep(self.cooldown)
+        if not self.max_active:
+            return
+        with self.lock:
+            while self.active_backends() >= self.max_active:
+                time.sleep(self.interval)
+
 def print_progress(llm, nlq_id, q_num, start_time=None):
     """Show execution process"""
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -33,36 +95,80 @@ def print_progress(llm, nlq_id, q_num, start_time=None):
     else:
         print(base_msg)
 
-def execute_query(query, cursor, llm, nlq_id, q_num):
-    """Execute query and return results with headers"""
+def execute_query(query, conn, llm, nlq_id, q_num, client_timeout_ms=CLIENT_TIMEOUT_MS, snapshot=None,
+                  store=None):
+    """Execute query and return results with headers, their multiset fingerprint and stored result id
+
+    Rows are streamed through a server-side cursor; only the 2000 characters
+    kept in the report are formatted. The statement is cancelled from the
+    client after client_timeout_ms. With snapshot (an exported snapshot id)
+    it reads the same data as every other worker. With store (a ResultStore)
+    the full result set is kept.
+    """
     start_time = datetime.now()
     print_progress(llm, nlq_id, q_num)
+    multiset = MultisetFingerprint(COLUMN_PERMUTATION, NUMERIC_DIGITS)
+    result_writer = store.writer() if store else None
+    result_id = ''
     
     try:
-        cursor.execute("DISCARD ALL;")
-        cursor.execute(query)
-        
-        if cursor.description:
+        with conn.cursor() as cursor:
+            cursor.execute("DISCARD ALL;")
+        with Watchdog(conn, client_timeout_ms):
+            capture = stream_result(conn, query, preview_chars=2000, fingerprint=RowFanout(multiset, result_writer),
+                                    snapshot=snapshot)
         
-            columns = [desc[0] for desc in cursor.description]
-            
-            data = cursor.fetchall()
-            result = "| ".join(columns) + "\n"  # Headers
-            result += "\n".join(["| ".join(map(str, row)) for row in data])
+        if capture is not None:
+            result = capture.text()
+            if result_writer:
+                result_id = result_writer.commit(capture.columns)
         else:
             result = "Executed query (No results)"
+            multiset = None
             
     except Exception as e:
         result = f"Error: {str(e)}"
+        multiset = None
+    if result_writer and not result_id:
+        result_writer.discard()
     
     print_progress(llm, nlq_id, q_num, start_time)
     
-    time.sleep(1)
-    
-    return str(result)[:2000]  
+    return str(result)[:2000], multiset, result_id
+
+def pooled_execute(pool, limiter, query, llm, nlq_id, q_num, snapshot=None, store=None):
+    """Run execute_query on a connection borrowed from the pool"""
+    limiter.wait()
+    conn = pool.getconn()
+    conn.autocommit = True
+    try:
+        return execute_query(query, conn, llm, nlq_id, q_num, snapshot=snapshot, store=store)
+    finally:
+        pool.putconn(conn)
+
+def async_execute(pending, llm_dir, workers, snapshot=None, store=None):
+    """Capture the pending statements with the asyncio backend"""
+    from async_backend import capture_many
 
-def process_llm(llm_dir, writer):
-    """Process all files of each LLM"""
+    def on_done(index, query, capture):
+        _, (_, nlq_id, q_num) = items[index]
+        print_progress(llm_dir, nlq_id, q_num)
+
+    items = list(pending.items())
+    settings = {'timeout_ms': ASYNC_TIMEOUT_MS, 'column_permutation': COLUMN_PERMUTATION,
+                'numeric_digits': NUMERIC_DIGITS, 'snapshot_id': snapshot, 'result_store': store}
+    captures = capture_many([query for _, (query, _, _) in items], DB_CONFIG, settings, workers, on_done)
+    return {fp: (capture['Result'], capture['Multiset'], capture['Result ID'])
+            for (fp, _), capture in zip(items, captures)}
+
+def process_llm(llm_dir, writer, pool, limiter, workers=WORKERS, cache=None, references=None, backend='thread',
+                snapshot=None, store=None, warehouse=None):
+    """Process all files of each LLM
+
+    cache maps SQL fingerprints to captured results, so equivalent statements
+    (of this or previous models) are executed only once. With warehouse every
+    capture is appended to its captures table.
+    """
     print(f"\n{'='*60}")
     print(f" Starting process for: {llm_dir.upper()} ")
     print(f"{'='*60}\n")
@@ -73,14 +179,8 @@ def process_llm(llm_dir, writer):
     except Exception as e:
         print(f"!! ERROR in file reading: {e}")
         return
-        
-        
-    conn = psycopg2.connect(**DB_CONFIG)
-    conn.autocommit = True
-    cursor = conn.cursor()
     
-    results = []
-    total_queries = 0
+    cells = []
     for idx, row in df.iterrows():
         nlq_full = row['NLQ']
         nlq_id = nlq_full.split(' - ')[0] if pd.notna(nlq_full) else 'UNknown'
@@ -89,16 +189,51 @@ def process_llm(llm_dir, writer):
             query = row.get(f'Q{q_num}')
             if pd.isna(query):
                 continue
-            
-            total_queries += 1
-            result = execute_query(query, cursor, llm_dir, nlq_id, q_num)
-            results.append({
-                'NLQ': nlq_id,
-                'Query': f'Q{q_num}',
-                'SQL': query,
-                'Result': result,
-                'Characters Returned': (len(result)) if ('result' in locals() and not result.startswith('Error')) else 0
-            })
+            cells.append((nlq_id, q_num, query))
+    
+    total_queries = len(cells)
+    if cache is None:
+        cache = {}
+    fingerprints = [fingerprint(query) for _, _, query in cells]
+    pending = {}
+    for (nlq_id, q_num, query), fp in zip(cells, fingerprints):
+        if fp not in cache and fp not in pending:
+            pending[fp] = (query, nlq_id, q_num)
+    print(f"Distinct statements to execute: {len(pending)} of {total_queries}")
+    
+    if backend == 'async':
+        cache.update(async_execute(pending, llm_dir, workers, snapshot, store))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {fp: executor.submit(pooled_execute, pool, limiter, query, llm_dir, nlq_id, q_num, snapshot,
+                                           store)
+                       for fp, (query, nlq_id, q_num) in pending.items()}
+            for fp, future in futures.items():
+                cache[fp] = future.result()
+    
+    results = []
+    for (nlq_id, q_num, query), fp in zip(cells, fingerprints):
+        result, multiset, result_id = cache[fp]
+        accuracy = verdict(multiset, (references or {}).get(nlq_id), result.startswith('Error'))
+        if store:
+            store.record((llm_dir, nlq_id, f'Q{q_num}'), result_id, multiset.rows if multiset else 0,
+                         'Error' if result.startswith('Error') else 'OK')
+        results.append({
+            'NLQ': nlq_id,
+            'Query': f'Q{q_num}',
+            'SQL': query,
+            'Result': result,
+            'Characters Returned': len(result) if not result.startswith('Error') else 0,
+            'Fingerprint': fp,
+            'Result ID': result_id,
+            'Execution Accuracy': accuracy
+        })
+        if warehouse:
+            warehouse.add('captures', model=llm_dir, nlq=nlq_id, query=f'Q{q_num}', fingerprint=fp,
+                          characters=results[-1]['Characters Returned'], failed=result.startswith('Error'),
+                          result_id=result_id, execution_accuracy=accuracy)
+    if warehouse:
+        warehouse.flush()
     
     
     df_results = pd.DataFrame(results)
@@ -106,32 +241,55 @@ def process_llm(llm_dir, writer):
     df_results.to_excel(writer, sheet_name=sheet_name, index=False)
     
     
-    workbook = writer.book
-    worksheet = writer.sheets[sheet_name]
-    worksheet.cell(row=1, column=df_results.shape[1]+1, value="Execution Accuracy")
     
     print(f"\n{'='*60}")
     print(f" FINALIZADO: {llm_dir.upper()}")
     print(f" Consultas procesadas: {total_queries}")
     print(f" Errores detectados: {len(df_results[df_results['Result'].str.startswith('Error')])}")
+    print(f" Execution Accuracy: {(df_results['Execution Accuracy'] == CORRECT).sum()}/{total_queries} correct")
     print(f"{'='*60}\n")
-    
-    cursor.close()
-    conn.close()
 
-def generate_report():
-    """Generate report"""
+def generate_report(workers=WORKERS, max_active=MAX_ACTIVE_BACKENDS, cooldown=COOLDOWN, backend='thread',
+                    snapshot=False, store_dir=RESULT_STORE_DIR, warehouse_dir=WAREHOUSE_DIR):
+    """Generate report
+
+    With snapshot, a coordinator connection exports one snapshot and every
+    worker of every model captures its results from it. With store_dir every
+    result set is kept in full in a ResultStore, and with warehouse_dir the
+    captures are appended to the results warehouse.
+    """
     start_total = datetime.now()
     print(f"\n{'#'*60}")
     print(f" START OF GLOBAL PROCESS: {start_total.strftime('%Y-%m-%d %H:%M:%S')} ")
     print(f"{'#'*60}\n")
     
-    with pd.ExcelWriter('LLM_Validation_Report.xlsx', engine='openpyxl') as writer:
-        for llm_dir in LLM_DIRS:
-            if os.path.exists(llm_dir):
-                process_llm(llm_dir, writer)
-            else:
-                print(f"!! path not found: {llm_dir}")
+    # One extra connection for the load checks of the limiter
+    pool = ThreadedConnectionPool(1, workers + 1, **DB_CONFIG)
+    limiter = ServerLoadLimiter(pool, max_active, cooldown)
+    cache = {}
+    references = load_references(REFERENCE_DIR, COLUMN_PERMUTATION, NUMERIC_DIGITS)
+    coordinator = psycopg2.connect(**DB_CONFIG) if snapshot else None
+    store = ResultStore(store_dir) if store_dir else None
+    warehouse = Warehouse(warehouse_dir) if warehouse_dir else None
+    try:
+        with ExportedSnapshot(coordinator) if snapshot else nullcontext() as snapshot_id:
+            if snapshot_id:
+                print(f"Captures pinned to snapshot {snapshot_id}")
+            with pd.ExcelWriter('LLM_Validation_Report.xlsx', engine='openpyxl') as writer:
+                for llm_dir in LLM_DIRS:
+                    if os.path.exists(llm_dir):
+                        process_llm(llm_dir, writer, pool, limiter, workers, cache, references, backend,
+                                    snapshot_id, store, warehouse)
+                    else:
+                        print(f"!! path not found: {llm_dir}")
+    finally:
+        if coordinator:
+            coordinator.close()
+        if store:
+            store.close()
+        if warehouse:
+            warehouse.close()
+        pool.closeall()
     
     total_time = datetime.now() - start_total
     print(f"\n{'#'*60}")
@@ -140,4 +298,20 @@ def generate_report():
     print(f"{'#'*60}")
 
 if __name__ == "__main__":
-    generate_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Capture the results of the LLM generated queries')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Concurrent connections')
+    parser.add_argument('--max-active', type=int, default=MAX_ACTIVE_BACKENDS,
+                        help='Wait while the server has this many active backends')
+    parser.add_argument('--cooldown', type=float, default=COOLDOWN,
+                        help='Fixed pause before each query (the old behaviour was 1 s)')
+    parser.add_argument('--backend', choices=['thread', 'async'], default='thread',
+                        help="'async' keeps --workers statements in flight with psycopg 3")
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Capture every model from one exported snapshot (REPEATABLE READ READ ONLY)')
+    parser.add_argument('--store', default=RESULT_STORE_DIR,
+                        help='Keep every captured result set in this content-addressed store (result_store.py)')
+    parser.add_argument('--warehouse', default=WAREHOUSE_DIR,
+                        help='Also append the captures to this Parquet warehouse (results_warehouse.py)')
+    args = parser.parse_args()
+    generate_report(args.workers, args.max_active, args.cooldown, args.backend, args.snapshot, args.store,
+                    args.warehouse)
@@ -0,0 +1,226 @@
+"""Concurrent load test of the LLM generated SQL.
+
+The benchmark engine measures one client at a time. Here N clients, each on
+its own connection, replay a random mix of the statements of the
+*-Evaluation.xlsx workbooks for a fixed duration, using the same measurement
+functions as the benchmark. Throughput (QPS) and p50/p95/p99 latency are
+reported per model and per NLQ, so models can be compared by how their SQL
+behaves under contention and not only in isolation.
+
+By default each model is loaded on its own, one phase after the other;
+--mixed replays the statements of every model in a single phase.
+"""
+import argparse
+import csv
+import random
+import threading
+import time
+from collections import defaultdict
+
+from benchmark_engine import (DB_CONFIG, MEASUREMENTS, MODEL_TIMEOUTS, SESSION_MEASUREMENTS, SETTINGS,
+                              TIMEOUTS, WORKBOOK_SUFFIX, classify_error, configure_session, connect,
+                              discover_models, load_queries, nlq_id, prepare_statement, prepared_name,
+                              resolve_workbook)
+from query_watchdog import Watchdog
+
+
+CLIENTS = 8
+DURATION = 60
+PERCENTILES = (50, 95, 99)
+ALL = 'All'
+
+LOAD_SETTINGS = {
+    **SETTINGS,
+    'measurement': 'isolated',
+    'clients': CLIENTS,
+    'duration': DURATION,
+    'mixed': False,
+    'seed': 0,
+    'output': 'load_test_resultados.csv',
+}
+
+HEADER = ['Phase', 'Model', 'NLQ', 'Clients', 'Requests', 'Errors', 'Timeouts', 'QPS',
+          *(f'p{p}' for p in PERCENTILES)]
+
+
+def percentile(values, p):
+    """p-th percentile (0-100) of sorted values, linearly interpolated"""
+    if not values:
+        return 'N/A'
+    position = (len(values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return round(values[lower] + (values[upper] - values[lower]) * (position - lower), 4)
+
+
+def load_workload(models, max_query):
+    """(model, NLQ id, Q label, query) of every statement of the given workbooks"""
+    workload = []
+    for model in models:
+        name, workbook = resolve_workbook(model)
+        for nlq, q_num, query in load_queries(workbook, max_query):
+            workload.append((name, nlq_id(nlq), f'Q{q_num}', query))
+    return workload
+
+
+def client(workload, settings, deadline, rng, samples):
+    """Replay random statements of workload on a dedicated connection until deadline
+
+    With the 'prepared' measurement each statement is PREPAREd once per
+    connection, untimed, the first time it is drawn.
+    """
+    conn = connect(settings['db_config'])
+    run_once = MEASUREMENTS[settings['measurement']]
+    prepared = set()
+    try:
+        if settings['measurement'] in SESSION_MEASUREMENTS:
+            configure_session(conn, settings)
+        while time.perf_counter() < deadline:
+            name, nlq, q_label, query = rng.choice(workload)
+            cursor = conn.cursor()
+            try:
+                if settings['measurement'] == 'prepared' and prepared_name(query) not in prepared:
+                    prepare_statement(cursor, query)
+                    prepared.add(prepared_name(query))
+                with Watchdog(conn, settings['client_timeout_ms']):
+                    latency = run_once(cursor, query, settings)
+                outcome = 'OK'
+            except Exception as e:
+                conn.rollback()
+                latency, outcome = None, classify_error(e)
+            finally:
+                cursor.close()
+            samples.append((name, nlq, q_label, latency, outcome))
+    finally:
+        conn.close()
+
+
+def run_phase(workload, settings):
+    """Run settings['clients'] clients for settings['duration'] seconds; return samples and elapsed seconds"""
+    samples = []
+    seeds = random.Random(settings['seed'])
+    start = time.perf_counter()
+    deadline = start + settings['duration']
+    threads = [threading.Thread(target=client, args=(workload, settings, deadline,
+                                                     random.Random(seeds.random()), samples))
+               for _ in range(settings['clients'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def _row_order(item):
+    (name, nlq), _ = item
+    return name, nlq != ALL, int(nlq) if nlq.isdigit() else 0, nlq
+
+
+def summarize_phase(phase, samples, elapsed, clients):
+    """One row per model and one per (model, NLQ)"""
+    groups = defaultdict(list)
+    for name, nlq, _, latency, outcome in samples:
+        groups[(name, ALL)].append((latency, outcome))
+        groups[(name, nlq)].append((latency, outcome))
+    rows = []
+    for (name, nlq), group in sorted(groups.items(), key=_row_order):
+        latencies = sorted(latency for latency, outcome in group if outcome == 'OK')
+        rows.append([
+            phase,
+            name,
+            nlq,
+            clients,
+            len(group),
+            sum(1 for _, outcome in group if outcome != 'OK'),
+            sum(1 for _, outcome in group if outcome in TIMEOUTS),
+            round(len(group) / elapsed, 2) if elapsed else 'N/A',
+            *(percentile(latencies, p) for p in PERCENTILES)
+        ])
+    return rows
+
+
+def run_load_test(models, settings=None, db_config=None):
+    """Load test every model (or all of them together with settings['mixed']) and write the summary CSV"""
+    settings = {**LOAD_SETTINGS, 'model_timeouts': MODEL_TIMEOUTS, **(settings or {}),
+                'db_config': db_config or DB_CONFIG}
+    if settings['mixed']:
+        phases = [('mixed', models, settings['timeout_ms'])]
+    else:
+        phases = [(resolve_workbook(model)[0], [model],
+                   settings['model_timeouts'].get(resolve_workbook(model)[0], settings['timeout_ms']))
+                  for model in models]
+
+    with open(settings['output'], 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for phase, phase_models, timeout_ms in phases:
+            workload = load_workload(phase_models, settings['max_query'])
+            if not workload:
+                print(f"!! No queries for {phase}")
+                continue
+            phase_settings = {**settings, 'timeout_ms': timeout_ms}
+            print(f"\n{'='*60}")
+            print(f" Load test {phase.upper()}: {len(workload)} statements, {settings['clients']} clients, "
+                  f"{settings['duration']} s")
+            print(f"{'='*60}\n")
+            samples, elapsed = run_phase(workload, phase_settings)
+            rows = summarize_phase(phase, samples, elapsed, settings['clients'])
+            writer.writerows(rows)
+            f.flush()
+            for row in (dict(zip(HEADER, row)) for row in rows):
+                if row['NLQ'] == ALL:
+                    print(f"{row['Model']}: {row['Requests']} requests, {row['QPS']} QPS, p50 {row['p50']} s, "
+                          f"p95 {row['p95']} s, p99 {row['p99']} s, {row['Errors']} errors")
+    print(f"\nLoad test results in {settings['output']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Replay the LLM generated SQL from concurrent clients')
+    parser.add_argument('models', nargs='*',
+                        help='Model folders or *-Evaluation.xlsx workbooks (default: auto-discover)')
+    parser.add_argument('--root', default='.', help='Folder searched when auto-discovering models')
+    parser.add_argument('--include-reference', action='store_true',
+                        help='Also load the ReferenceQueries workbook when auto-discovering')
+    parser.add_argument('-o', '--output', default=LOAD_SETTINGS['output'], help='CSV output')
+    parser.add_argument('--clients', type=int, default=LOAD_SETTINGS['clients'], help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=LOAD_SETTINGS['duration'],
+                        help='Seconds each phase lasts')
+    parser.add_argument('--mixed', action='store_true',
+                        help='Replay the statements of all the models together in one phase')
+    parser.add_argument('--seed', type=int, default=LOAD_SETTINGS['seed'], help='Seed of the statement mix')
+    parser.add_argument('--measurement', choices=sorted(MEASUREMENTS), default=LOAD_SETTINGS['measurement'])
+    parser.add_argument('--timeout-ms', type=int, default=None,
+                        help='statement_timeout for every model (overrides the per-model defaults)')
+    parser.add_argument('--client-timeout-ms', type=int, default=LOAD_SETTINGS['client_timeout_ms'])
+    parser.add_argument('--max-query', type=int, default=LOAD_SETTINGS['max_query'],
+                        help='Highest Q column read from the workbooks')
+    for key, value in DB_CONFIG.items():
+        parser.add_argument(f'--{key}', default=value)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    models = args.models or discover_models(args.root, args.include_reference)
+    if not models:
+        print(f"!! No *{WORKBOOK_SUFFIX} workbooks found under {args.root}")
+        return
+    settings = {
+        'output': args.output,
+        'clients': args.clients,
+        'duration': args.duration,
+        'mixed': args.mixed,
+        'seed': args.seed,
+        'measurement': args.measurement,
+        'client_timeout_ms': args.client_timeout_ms,
+        'max_query': args.max_query,
+    }
+    if args.timeout_ms is not None:
+        settings['timeout_ms'] = args.timeout_ms
+        settings['model_timeouts'] = {}
+    db_config = {key: getattr(args, key) for key in DB_CONFIG}
+    run_load_test(models, settings, db_config)
+
+
+if __name__ == "__main__":
+    main()
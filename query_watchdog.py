@@ -0,0 +1,63 @@
+"""Client-side wall-clock deadline for a statement.
+
+statement_timeout only bounds the server side: a large result can still keep
+psycopg2 busy while it is transferred and decoded, and connections without a
+timeout are not bounded at all. A Watchdog starts a timer thread when it is
+entered; if the deadline passes before the block ends, it calls
+connection.cancel() (thread safe in psycopg2) and the resulting error is
+raised as ClientTimeout, classified as CLIENT_TIMEOUT instead of 'Timeout'.
+"""
+import threading
+
+
+CLIENT_TIMEOUT = 'Client timeout'
+
+
+class ClientTimeout(Exception):
+    """The client deadline passed and the statement was cancelled"""
+
+
+class Watchdog:
+    """Cancel the statement running on conn once timeout_ms have elapsed
+
+    with Watchdog(conn, timeout_ms):
+        cursor.execute(query)
+        rows = cursor.fetchall()
+
+    A falsy timeout_ms disables the watchdog.
+    """
+
+    def __init__(self, conn, timeout_ms=None):
+        self.conn = conn
+        self.timeout_ms = timeout_ms
+        self.fired = False
+        self.lock = threading.Lock()
+        self.active = False
+        self.timer = None
+
+    def _cancel(self):
+        with self.lock:
+            if not self.active:
+                return
+            self.fired = True
+            try:
+                self.conn.cancel()
+            except Exception as e:
+                print(f"Cancel failed: {str(e)[:200]}")
+
+    def __enter__(self):
+        if self.timeout_ms:
+            self.active = True
+            self.timer = threading.Timer(self.timeout_ms / 1000, self._cancel)
+            self.timer.daemon = True
+            self.timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timer:
+            with self.lock:
+                self.active = False
+            self.timer.cancel()
+        if self.fired and exc_type is not None and issubclass(exc_type, Exception):
+            raise ClientTimeout(f"client timeout after {self.timeout_ms} ms") from exc
+        return False
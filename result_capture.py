@@ -0,0 +1,169 @@
+"""Streaming capture of query results.
+
+Row-returning statements are read through a named (server-side) cursor in
+batches of FETCH_SIZE rows. Every row goes through a running hash and a row
+counter, but only the first preview_chars characters are ever formatted into
+the text preview, so memory stays flat whatever the size of the result.
+
+Parallel captures can be pinned to the same data: an ExportedSnapshot keeps a
+coordinator transaction open and every capture given its snapshot id runs in
+a REPEATABLE READ READ ONLY transaction that imports it.
+"""
+import hashlib
+import uuid
+
+from sql_fingerprint import tokenize
+
+
+FETCH_SIZE = 2000
+ROW_RETURNING = ('select', 'with', 'values', 'table', '(')
+SNAPSHOT_ISOLATION_SQL = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;"
+
+
+def leading_keyword(query):
+    """First token of a statement in lower case, after any leading comments ('' when empty)"""
+    tokens = tokenize(str(query))
+    return tokens[0][1] if tokens else ''
+
+
+def is_row_returning(query):
+    """Statements that can be DECLAREd as a server-side cursor"""
+    return leading_keyword(query) in ROW_RETURNING
+
+
+def format_row(row):
+    return "| ".join(map(str, row))
+
+
+class RowFanout:
+    """Passes every batch of rows to several sinks (fingerprints, sorters, stores)"""
+
+    def __init__(self, *sinks):
+        self.sinks = [sink for sink in sinks if sink is not None]
+
+    def add_rows(self, rows):
+        for sink in self.sinks:
+            sink.add_rows(rows)
+
+
+class ResultCapture:
+    """Running row count, hash and bounded preview of a result set"""
+
+    def __init__(self, preview_chars=2000, fingerprint=None):
+        self.preview_chars = preview_chars
+        self.fingerprint = fingerprint
+        self.columns = []
+        self.rows = 0
+        self.digest = hashlib.sha1()
+        self.preview = []
+        self.preview_len = 0
+
+    def set_columns(self, description):
+        self.columns = [desc[0] for desc in description]
+        self._add_preview("| ".join(self.columns))
+
+    def _add_preview(self, line):
+        if self.preview_len < self.preview_chars:
+            self.preview.append(line)
+            self.preview_len += len(line) + 1
+
+    def add_rows(self, rows):
+        for row in rows:
+            line = format_row(row)
+            self.digest.update(line.encode('utf-8') + b'\n')
+            self._add_preview(line)
+        if self.fingerprint is not None:
+            self.fingerprint.add_rows(rows)
+        self.rows += len(rows)
+
+    @property
+    def result_hash(self):
+        return self.digest.hexdigest()[:16]
+
+    def text(self):
+        return "\n".join(self.preview)[:self.preview_chars]
+
+
+class ExportedSnapshot:
+    """Coordinator transaction whose snapshot the parallel captures import
+
+    with ExportedSnapshot(conn) as snapshot:
+        stream_result(worker_conn, query, snapshot=snapshot)
+
+    The snapshot can be imported for as long as the block is open.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.autocommit = None
+        self.id = None
+
+    def __enter__(self):
+        self.autocommit = self.conn.autocommit
+        self.conn.autocommit = False
+        with self.conn.cursor() as cursor:
+            cursor.execute(SNAPSHOT_ISOLATION_SQL)
+            cursor.execute("SELECT pg_export_snapshot();")
+            self.id = cursor.fetchone()[0]
+        return self.id
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.rollback()
+        self.conn.autocommit = self.autocommit
+        return False
+
+
+def _stream_plain(cursor, query, capture, fetch_size):
+    cursor.execute(query)
+    if not cursor.description:
+        return None
+    capture.set_columns(cursor.description)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        capture.add_rows(rows)
+    return capture
+
+
+def stream_result(conn, query, preview_chars=2000, fetch_size=FETCH_SIZE, fingerprint=None, snapshot=None):
+    """Execute query and stream its rows into a ResultCapture
+
+    Returns None for statements that return no rows. Errors are raised to the
+    caller. conn is expected in autocommit mode; the server-side cursor runs in
+    its own short transaction. fingerprint (e.g. an execution_accuracy
+    MultisetFingerprint) also receives every row. With snapshot (an
+    ExportedSnapshot id) that transaction is REPEATABLE READ READ ONLY and sees
+    the coordinator's data.
+    """
+    capture = ResultCapture(preview_chars, fingerprint)
+    if not is_row_returning(query) and snapshot is None:
+        with conn.cursor() as cursor:
+            return _stream_plain(cursor, query, capture, fetch_size)
+
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        if snapshot is not None:
+            with conn.cursor() as cursor:
+                cursor.execute(SNAPSHOT_ISOLATION_SQL)
+                cursor.execute("SET TRANSACTION SNAPSHOT %s;", (snapshot,))
+        if is_row_returning(query):
+            with conn.cursor(name=f'capture_{uuid.uuid4().hex[:12]}') as cursor:
+                cursor.itersize = fetch_size
+                cursor.execute(query)
+                rows = cursor.fetchmany(fetch_size)
+                capture.set_columns(cursor.description)
+                while rows:
+                    capture.add_rows(rows)
+                    rows = cursor.fetchmany(fetch_size)
+        else:
+            with conn.cursor() as cursor:
+                capture = _stream_plain(cursor, query, capture, fetch_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = autocommit
+    return capture
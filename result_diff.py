@@ -0,0 +1,215 @@
+"""Bounded-memory, order-insensitive comparison of result sets.
+
+The multiset fingerprints of execution_accuracy say whether two results are
+equal; this module says how they differ. Rows are normalized the same way,
+buffered up to a memory ceiling, sorted and spilled to temporary files, and
+the sorted runs are merged (external merge sort). Walking the merged
+reference and generated rows side by side gives exact multiset equality plus
+the number of missing and extra rows and the first few of each, without ever
+holding either result in memory.
+
+Usage:
+    python result_diff.py 9 --sql "SELECT ..."          # NLQ 9 reference vs a query
+    python result_diff.py Q9-Output.csv --csv other.csv  # two CSV files
+"""
+import argparse
+import csv
+import heapq
+import os
+import tempfile
+
+from execution_accuracy import NUMERIC_DIGITS, REFERENCE_DIR, normalize_row
+
+
+MEMORY_MB = 64
+DIFF_ROWS = 5
+SEPARATOR = '\x1f'
+# Rough per-line cost of a buffered str on top of its characters
+LINE_OVERHEAD = 64
+
+
+def encode_row(values):
+    """One sortable text line per normalized row"""
+    line = SEPARATOR.join(values)
+    return line.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def decode_row(line):
+    values = line.replace('\\\\', '\x00').replace('\\n', '\n').replace('\\r', '\r').replace('\x00', '\\')
+    return "| ".join(values.split(SEPARATOR))
+
+
+class RowSorter:
+    """Normalized rows sorted with at most memory_mb buffered in memory
+
+    Has the add_rows() interface of a MultisetFingerprint, so it can be given
+    to result_capture.stream_result as its fingerprint. Iterating yields the
+    encoded rows in sorted order.
+    """
+
+    def __init__(self, column_permutation=False, digits=NUMERIC_DIGITS, memory_mb=MEMORY_MB, tmpdir=None):
+        self.column_permutation = column_permutation
+        self.digits = digits
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.tmpdir = tmpdir
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.runs = []
+        self.rows = 0
+
+    def add_row(self, row):
+        line = encode_row(normalize_row(row, self.column_permutation, self.digits))
+        self.buffer.append(line)
+        self.buffer_bytes += len(line) + LINE_OVERHEAD
+        self.rows += 1
+        if self.buffer_bytes >= self.memory_bytes:
+            self._spill()
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.add_row(row)
+
+    def _spill(self):
+        self.buffer.sort()
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.run',
+                                         dir=self.tmpdir, delete=False) as f:
+            for line in self.buffer:
+                f.write(line + '\n')
+        self.runs.append(f.name)
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def __iter__(self):
+        if not self.runs:
+            yield from sorted(self.buffer)
+            return
+        if self.buffer:
+            self._spill()
+        files = [open(path, encoding='utf-8', newline='\n') for path in self.runs]
+        try:
+            yield from heapq.merge(*((line[:-1] for line in f) for f in files))
+        finally:
+            for f in files:
+                f.close()
+
+    def close(self):
+        for path in self.runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.runs = []
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def sort_csv(path, column_permutation=False, digits=NUMERIC_DIGITS, memory_mb=MEMORY_MB):
+    """RowSorter over the rows of an output CSV (with header)"""
+    sorter = RowSorter(column_permutation, digits, memory_mb)
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            sorter.add_row(row)
+    return sorter
+
+
+def diff_sorted(expected, actual, max_rows=DIFF_ROWS):
+    """Multiset difference of two sorted row streams
+
+    'Missing' counts rows of expected absent from actual and 'Extra' the
+    opposite; at most max_rows of each are kept as examples.
+    """
+    diff = {'Equal': True, 'Missing': 0, 'Extra': 0, 'Missing Rows': [], 'Extra Rows': []}
+
+    def record(kind, line):
+        diff['Equal'] = False
+        diff[kind] += 1
+        if len(diff[f'{kind} Rows']) < max_rows:
+            diff[f'{kind} Rows'].append(decode_row(line))
+
+    expected, actual = iter(expected), iter(actual)
+    e, a = next(expected, None), next(actual, None)
+    while e is not None or a is not None:
+        if a is None or e is not None and e < a:
+            record('Missing', e)
+            e = next(expected, None)
+        elif e is None or a < e:
+            record('Extra', a)
+            a = next(actual, None)
+        else:
+            e, a = next(expected, None), next(actual, None)
+    return diff
+
+
+def format_diff(diff, preview_chars=2000):
+    """Text of a diff: '-' rows missing from the result, '+' unexpected rows"""
+    lines = [f"{diff['Missing']} missing, {diff['Extra']} extra"]
+    lines += [f"- {row}" for row in diff['Missing Rows']]
+    lines += [f"+ {row}" for row in diff['Extra Rows']]
+    return "\n".join(lines)[:preview_chars]
+
+
+def reference_path(nlq, reference_dir=REFERENCE_DIR):
+    return os.path.join(reference_dir, f'Q{nlq}-Output.csv')
+
+
+def diff_query(conn, query, reference, settings=None):
+    """Stream query and diff its rows against the reference CSV
+
+    settings may hold column_permutation, numeric_digits, diff_rows,
+    diff_memory_mb and snapshot_id, as in the benchmark engine.
+    """
+    from result_capture import stream_result
+
+    settings = settings or {}
+    column_permutation = settings.get('column_permutation', False)
+    digits = settings.get('numeric_digits', NUMERIC_DIGITS)
+    memory_mb = settings.get('diff_memory_mb', MEMORY_MB)
+    with sort_csv(reference, column_permutation, digits, memory_mb) as expected, \
+            RowSorter(column_permutation, digits, memory_mb) as actual:
+        stream_result(conn, query, 0, fingerprint=actual, snapshot=settings.get('snapshot_id'))
+        return diff_sorted(expected, actual, settings.get('diff_rows', DIFF_ROWS))
+
+
+def main(argv=None):
+    from benchmark_engine import DB_CONFIG, connect
+
+    parser = argparse.ArgumentParser(description='Row-level diff of a result against a reference output')
+    parser.add_argument('reference', help='NLQ id (ReferenceQueries&Outputs/Q<id>-Output.csv) or CSV path')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--sql', help='Query whose result is compared')
+    source.add_argument('--csv', help='CSV output (with header) compared instead of a query')
+    parser.add_argument('--diff-rows', type=int, default=DIFF_ROWS, help='Examples shown per side')
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_MB,
+                        help='Memory (MB) used by the external sort before spilling')
+    parser.add_argument('--column-permutation', action='store_true')
+    parser.add_argument('--numeric-digits', type=int, default=NUMERIC_DIGITS)
+    for key, value in DB_CONFIG.items():
+        parser.add_argument(f'--{key}', default=value)
+    args = parser.parse_args(argv)
+
+    reference = args.reference if os.path.exists(args.reference) else reference_path(args.reference)
+    settings = {'column_permutation': args.column_permutation, 'numeric_digits': args.numeric_digits,
+                'diff_rows': args.diff_rows, 'diff_memory_mb': args.memory_mb}
+    if args.csv:
+        with sort_csv(reference, args.column_permutation, args.numeric_digits, args.memory_mb) as expected, \
+                sort_csv(args.csv, args.column_permutation, args.numeric_digits, args.memory_mb) as actual:
+            diff = diff_sorted(expected, actual, args.diff_rows)
+    else:
+        conn = connect({key: getattr(args, key) for key in DB_CONFIG})
+        try:
+            diff = diff_query(conn, args.sql, reference, settings)
+        finally:
+            conn.close()
+    print("Equal" if diff['Equal'] else format_diff(diff))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Content-addressed store of the captured result sets.
+
+The reports only keep the first 2000 characters of each result. The store
+keeps every result set in full, once per distinct content, so EX can be
+re-checked and mismatches diffed offline without executing any SQL:
+
+    <root>/objects/<id[:2]>/<id>.jsonl.zst   one file per distinct result
+    <root>/index.csv                         (Model, NLQ, Query Number) -> Result ID
+
+Objects are columnar: rows are grouped in ROW_GROUP rows, each group written
+as one JSON line holding a list of values per column, and the file ends with
+a footer line holding the column names and the row count (as in Parquet, the
+metadata goes last so results can be written while they are streamed). The
+Result ID is the sha1 of the uncompressed content, so the same result
+produced by several models or variants is stored once. Files are compressed
+with zstd when the zstandard package is installed and with zlib (gzip)
+otherwise; both can always be read back.
+
+Usage:
+    python result_store.py result_store --revalidate
+    python result_store.py result_store --diff GPT-4o 9 Q2
+"""
+import argparse
+import csv
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from execution_accuracy import (NUMERIC_DIGITS, REFERENCE_DIR, MultisetFingerprint, load_references,
+                                verdict)
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, zlib is used instead
+    zstandard = None
+
+
+ROW_GROUP = 1000
+INDEX_HEADER = ['Model', 'NLQ', 'Query Number', 'Result ID', 'Rows', 'Status']
+EXTENSIONS = ('.jsonl.zst', '.jsonl.gz')
+
+
+def _json_value(value):
+    """Values JSON cannot hold natively, in the text form normalize_value understands"""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).isoformat()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def _open_write(path):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, 'wb')
+
+
+def _open_read(path):
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError('Reading .zst results needs the zstandard package: pip install zstandard')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return gzip.open(path, 'rb')
+
+
+class ResultWriter:
+    """Streams one result set into a temporary object; commit() files it under its content id
+
+    Has the add_rows() interface of a MultisetFingerprint, so it can be given to
+    result_capture.stream_result (through a RowFanout).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        fd, self.path = tempfile.mkstemp(suffix='.tmp', dir=store.tmp_dir)
+        os.close(fd)
+        self.file = _open_write(self.path)
+        self.digest = hashlib.sha1()
+        self.group = []
+        self.rows = 0
+
+    def _write(self, payload):
+        line = json.dumps(payload, default=_json_value, ensure_ascii=False).encode('utf-8') + b'\n'
+        self.digest.update(line)
+        self.file.write(line)
+
+    def _flush_group(self):
+        if self.group:
+            self._write({'c': [list(column) for column in zip(*self.group)]})
+            self.group = []
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.group.append(tuple(row))
+            if len(self.group) >= ROW_GROUP:
+                self._flush_group()
+        self.rows += len(rows)
+
+    def commit(self, columns):
+        """Finish the object and return its Result ID"""
+        self._flush_group()
+        self._write({'columns': list(columns), 'rows': self.rows})
+        self.file.close()
+        result_id = self.digest.hexdigest()
+        path = self.store.object_path(result_id)
+        if os.path.exists(path):
+            os.remove(self.path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.path, path)
+        return result_id
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path)
+
+
+class ResultStore:
+    """Directory of content-addressed result objects plus their (model, NLQ, Q) index"""
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.index_path = os.path.join(root, 'index.csv')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        new_index = not os.path.exists(self.index_path)
+        self.index_file = open(self.index_path, 'a', newline='', encoding='utf-8')
+        self.index_writer = csv.writer(self.index_file)
+        if new_index:
+            self.index_writer.writerow(INDEX_HEADER)
+            self.index_file.flush()
+
+    def object_path(self, result_id):
+        extension = EXTENSIONS[0] if zstandard is not None else EXTENSIONS[1]
+        for candidate in EXTENSIONS:
+            path = os.path.join(self.root, 'objects', result_id[:2], result_id + candidate)
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.root, 'objects', result_id[:2], result_id + extension)
+
+    def writer(self):
+        return ResultWriter(self)
+
+    def record(self, key, result_id, rows, status):
+        """Point (model, NLQ, Q) at a result; result_id is '' for errors and statements without rows"""
+        self.index_writer.writerow([*key, result_id or '', rows, status])
+        self.index_file.flush()
+
+    def index(self):
+        """Latest index entry of every (model, NLQ, Q)"""
+        self.index_file.flush()
+        entries = {}
+        with open(self.index_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                entries[(row['Model'], row['NLQ'], row['Query Number'])] = row
+        return entries
+
+    def _lines(self, result_id):
+        with _open_read(self.object_path(result_id)) as f:
+            buffer = b''
+            while chunk := f.read(1 << 20):
+                buffer += chunk
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    yield json.loads(line)
+
+    def rows(self, result_id):
+        """Rows of a stored result, one row group at a time"""
+        for payload in self._lines(result_id):
+            if 'c' in payload:
+                yield from zip(*payload['c'])
+
+    def columns(self, result_id):
+        for payload in self._lines(result_id):
+            if 'columns' in payload:
+                return payload['columns']
+        return []
+
+    def close(self):
+        self.index_file.close()
+
+
+def revalidate(store, reference_dir=REFERENCE_DIR, column_permutation=False, digits=NUMERIC_DIGITS):
+    """EX verdict of every indexed cell recomputed from the stored results"""
+    references = load_references(reference_dir, column_permutation, digits)
+    fingerprints = {}
+    verdicts = {}
+    for key, entry in store.index().items():
+        result_id = entry['Result ID']
+        if result_id and result_id not in fingerprints:
+            fingerprint = MultisetFingerprint(column_permutation, digits)
+            fingerprint.add_rows(store.rows(result_id))
+            fingerprints[result_id] = fingerprint
+        failed = entry['Status'] != 'OK'
+        verdicts[key] = verdict(fingerprints.get(result_id), references.get(key[1]), failed)
+    return verdicts
+
+
+def main(argv=None):
+    from result_diff import RowSorter, diff_sorted, format_diff, reference_path, sort_csv
+
+    parser = argparse.ArgumentParser(description='Offline re-validation of the stored result sets')
+    parser.add_argument('root', help='Result store directory')
+    parser.add_argument('--revalidate', action='store_true', help='Recompute the EX verdict of every cell')
+    parser.add_argument('--diff', nargs=3, metavar=('MODEL', 'NLQ', 'Q'),
+                        help='Row diff of one cell against its reference output')
+    parser.add_argument('--reference-dir', default=REFERENCE_DIR)
+    parser.add_argument('--column-permutation', action='store_true')
+    parser.add_argument('--numeric-digits', type=int, default=NUMERIC_DIGITS)
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.root)
+    try:
+        if args.revalidate:
+            verdicts = revalidate(store, args.reference_dir, args.column_permutation, args.numeric_digits)
+            out_path = os.path.join(args.root, 'revalidation.csv')
+            with open(out_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Model', 'NLQ', 'Query Number', 'Execution Accuracy'])
+                for key, accuracy in sorted(verdicts.items()):
+                    writer.writerow([*key, accuracy])
+            totals = {}
+            for (model, _, _), accuracy in verdicts.items():
+                totals.setdefault(model, {}).setdefault(accuracy, 0)
+                totals[model][accuracy] += 1
+            for model, counts in sorted(totals.items()):
+                print(f"{model}: " + ", ".join(f"{n} {accuracy}" for accuracy, n in sorted(counts.items())))
+            print(f"Verdicts written to {out_path}")
+        if args.diff:
+            model, nlq, q_label = args.diff
+            entry = store.index().get((model, nlq, q_label if q_label.startswith('Q') else f'Q{q_label}'))
+            if not entry or not entry['Result ID']:
+                print(f"!! No stored result for {model} NLQ {nlq} {q_label}")
+                return
+            with sort_csv(reference_path(nlq, args.reference_dir), args.column_permutation,
+                          args.numeric_digits) as expected, \
+                    RowSorter(args.column_permutation, args.numeric_digits) as actual:
+                actual.add_rows(store.rows(entry['Result ID']))
+                diff = diff_sorted(expected, actual)
+            print("Equal" if diff['Equal'] else format_diff(diff))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
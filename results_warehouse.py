@@ -0,0 +1,210 @@
+"""Columnar warehouse of every benchmark and capture result.
+
+The runners append typed rows to a Parquet dataset, one directory per table
+and one part file per flush, instead of (or next to) the per-model CSV and
+Excel outputs:
+
+    <root>/runs/      one row per timed run: status and seconds
+    <root>/cells/     one row per (model, NLQ, Q) of a session: summary, EX verdict
+    <root>/plans/     EXPLAIN ANALYZE metrics of each run
+    <root>/captures/  generate_llm_reports.py captures and EX verdicts
+
+Every row carries the session it was written by, so repeated or resumed runs
+can be told apart. Reading a table is one scan of its directory, and with
+duckdb installed query() runs SQL over all the tables at once.
+
+Needs pyarrow (pip install pyarrow); duckdb is optional.
+"""
+import glob
+import os
+import statistics
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency, only needed when the warehouse is used
+    pyarrow = None
+
+try:
+    import duckdb
+except ImportError:  # optional dependency, only needed for query()
+    duckdb = None
+
+
+WAREHOUSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results_warehouse')
+
+# Column types of every table; statuses are categorical
+SCHEMAS = {
+    'runs': {
+        'session': 'string', 'model': 'string', 'nlq': 'Int64', 'query': 'string', 'run': 'Int64',
+        'status': 'category', 'seconds': 'float64', 'measurement': 'string', 'timeout_ms': 'Int64',
+    },
+    'cells': {
+        'session': 'string', 'model': 'string', 'nlq': 'Int64', 'nlq_text': 'string', 'query': 'string',
+        'runs': 'Int64', 'successes': 'Int64', 'mean': 'float64', 'stdev': 'float64', 'median': 'float64',
+        'precision': 'float64', 'fingerprint': 'string', 'shared_from': 'string', 'validation': 'category',
+        'estimated_cost': 'float64', 'estimated_rows': 'float64', 'budget': 'category', 'rows': 'Int64',
+        'result_hash': 'string', 'result_id': 'string', 'execution_accuracy': 'category',
+    },
+    'plans': {
+        'session': 'string', 'model': 'string', 'nlq': 'Int64', 'query': 'string', 'run': 'string',
+        'planning_ms': 'float64', 'execution_ms': 'float64', 'shared_hit_blocks': 'Int64',
+        'shared_read_blocks': 'Int64', 'plan': 'string',
+    },
+    'captures': {
+        'session': 'string', 'model': 'string', 'nlq': 'Int64', 'query': 'string', 'fingerprint': 'string',
+        'characters': 'Int64', 'failed': 'boolean', 'result_id': 'string', 'execution_accuracy': 'category',
+    },
+}
+OK = 'OK'
+
+
+def arrow_schema(table):
+    """Explicit Arrow schema of a table, so a part whose column is all null keeps its type
+
+    Categorical columns are stored as plain strings and become categorical
+    again in read_table.
+    """
+    types = {
+        'string': pyarrow.string(), 'Int64': pyarrow.int64(), 'float64': pyarrow.float64(),
+        'boolean': pyarrow.bool_(), 'category': pyarrow.string(),
+    }
+    return pyarrow.schema([(column, types[dtype]) for column, dtype in SCHEMAS[table].items()])
+
+
+def _number(value):
+    """float for numeric values, None for 'N/A' and other placeholders"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _nlq_number(nlq):
+    nlq = str(nlq).split(' - ')[0].strip()
+    return int(nlq) if nlq.isdigit() else None
+
+
+class Warehouse:
+    """Buffered writer of the warehouse tables; flush() appends one Parquet part per table"""
+
+    def __init__(self, root=WAREHOUSE_DIR, session=None):
+        if pyarrow is None:
+            raise RuntimeError('The results warehouse needs pyarrow: pip install pyarrow')
+        self.root = root
+        self.session = session or datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.pending = {table: [] for table in SCHEMAS}
+
+    def add(self, table, **values):
+        self.pending[table].append({'session': self.session, **values})
+
+    def add_runs(self, model, nlq, query, results, settings):
+        """One runs row per entry of a benchmark_query result list"""
+        for run, result in enumerate(results, 1):
+            seconds = result if isinstance(result, float) else None
+            self.add('runs', model=model, nlq=_nlq_number(nlq), query=query, run=run,
+                     status=OK if seconds is not None else str(result), seconds=seconds,
+                     measurement=settings['measurement'], timeout_ms=settings['timeout_ms'])
+
+    def add_cell(self, model, nlq, query, results, stats, **values):
+        tiempos = [r for r in results if isinstance(r, float)]
+        median = statistics.median(tiempos) if tiempos else None
+        self.add('cells', model=model, nlq=_nlq_number(nlq), nlq_text=str(nlq), query=query,
+                 runs=len(results), successes=len(tiempos), mean=_number(stats['promedio']),
+                 stdev=_number(stats['desviacion']), median=median, precision=_number(stats['precision']),
+                 **values)
+
+    def add_plan(self, model, nlq, query, run, explain):
+        self.add('plans', model=model, nlq=_nlq_number(nlq), query=query, run=str(run),
+                 planning_ms=explain['Planning Time'], execution_ms=explain['Execution Time'],
+                 shared_hit_blocks=explain['Shared Hit Blocks'], shared_read_blocks=explain['Shared Read Blocks'],
+                 plan=explain['Plan'])
+
+    def flush(self):
+        for table, rows in self.pending.items():
+            if not rows:
+                continue
+            directory = os.path.join(self.root, table)
+            os.makedirs(directory, exist_ok=True)
+            frame = typed_frame(table, rows)
+            part = pyarrow.Table.from_pandas(frame, schema=arrow_schema(table), preserve_index=False)
+            pyarrow.parquet.write_table(part, os.path.join(directory,
+                                                           f'part-{self.session}-{uuid.uuid4().hex[:8]}.parquet'))
+            self.pending[table] = []
+
+    def close(self):
+        self.flush()
+
+
+def typed_frame(table, rows):
+    """DataFrame of rows with the SCHEMAS column order and types"""
+    schema = SCHEMAS[table]
+    frame = pd.DataFrame(rows, columns=list(schema))
+    for column, dtype in schema.items():
+        if dtype in ('float64',):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        elif dtype == 'Int64':
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').round().astype('Int64')
+        else:
+            frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+def read_table(table, root=WAREHOUSE_DIR, session=None, model=None):
+    """Every part of a table as one DataFrame
+
+    Optionally restricted to one model and to one session; 'latest' is the
+    last session that wrote rows of that model.
+    """
+    parts = sorted(glob.glob(os.path.join(glob.escape(root), table, '*.parquet')))
+    if not parts:
+        return typed_frame(table, [])
+    # every part is read with the full schema, whichever part the reader would infer it from
+    frame = pd.read_parquet(os.path.join(root, table), schema=arrow_schema(table))
+    frame = typed_frame(table, frame)
+    if model is not None:
+        frame = frame[frame['model'] == model]
+    if session == 'latest':
+        session = frame['session'].max()
+    if session is not None:
+        frame = frame[frame['session'] == session]
+    return frame.reset_index(drop=True)
+
+
+def execution_table(model, root=WAREHOUSE_DIR, session='latest', runs=None):
+    """Wide per-model table shaped like <model>_resultados_ejecucion.csv after parsing
+
+    Columns NLQ, Query Number, Execution 1..N (seconds, or the status of a
+    failed run; at least runs of them), Promedio and Desviación, ready for
+    execution_results.summarize_executions.
+    """
+    timed = read_table('runs', root, session, model)
+    cells = read_table('cells', root, session, model)[['nlq', 'nlq_text', 'query', 'mean', 'stdev']]
+    timed = timed.assign(value=timed['seconds'].astype(object).where(timed['status'] == OK,
+                                                                     timed['status'].astype(object)))
+    wide = timed.groupby(['nlq', 'query', 'run'])['value'].last().unstack('run')
+    wide = wide.reindex(columns=range(1, max([runs or 0, *wide.columns]) + 1))
+    wide.columns = [f'Execution {run}' for run in wide.columns]
+    wide = wide.reset_index().merge(cells, on=['nlq', 'query'], how='left')
+    wide = wide.rename(columns={'query': 'Query Number', 'mean': 'Promedio', 'stdev': 'Desviación'})
+    wide['NLQ'] = wide.pop('nlq_text')
+    return wide.drop(columns='nlq')
+
+
+def query(sql, root=WAREHOUSE_DIR):
+    """Run SQL with duckdb over views named after the tables (runs, cells, plans, captures)"""
+    if duckdb is None:
+        raise RuntimeError('query() needs duckdb: pip install duckdb')
+    con = duckdb.connect()
+    try:
+        for table in SCHEMAS:
+            pattern = os.path.join(root, table, '*.parquet')
+            if glob.glob(os.path.join(glob.escape(root), table, '*.parquet')):
+                con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}')")
+        return con.execute(sql).df()
+    finally:
+        con.close()
@@ -0,0 +1,71 @@
+"""Checkpoint store for benchmark runs.
+
+Every run is appended to a CSV file as soon as it finishes, keyed by
+(model, NLQ, query number, run index), so an interrupted benchmark can be
+restarted and only execute the runs that are still missing.
+"""
+import csv
+import os
+
+
+CELL_DONE = 'done'
+
+
+def parse_result(value):
+    """Stored results are either elapsed seconds or an error type"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class RunStore:
+    """Append-only CSV with one row per executed run"""
+
+    HEADER = ['Model', 'NLQ', 'Query Number', 'Run', 'Result']
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.runs = {}
+        self.done = set()
+        resume = resume and os.path.exists(path)
+        if resume:
+            self._load()
+        self.file = open(path, 'a' if resume else 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if not resume:
+            self.writer.writerow(self.HEADER)
+            self.file.flush()
+
+    def _load(self):
+        with open(self.path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                key = (row['Model'], row['NLQ'], row['Query Number'])
+                if row['Run'] == CELL_DONE:
+                    self.done.add(key)
+                else:
+                    self.runs.setdefault(key, {})[int(row['Run'])] = parse_result(row['Result'])
+
+    def completed(self, key):
+        """Results of the consecutive runs 1..n already stored for a cell"""
+        stored = self.runs.get(key, {})
+        results = []
+        while len(results) + 1 in stored:
+            results.append(stored[len(results) + 1])
+        return results
+
+    def is_done(self, key):
+        return key in self.done
+
+    def record(self, key, run_index, result):
+        self.runs.setdefault(key, {})[run_index] = result
+        self.writer.writerow([*key, run_index, result])
+        self.file.flush()
+
+    def mark_done(self, key):
+        self.done.add(key)
+        self.writer.writerow([*key, CELL_DONE, ''])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,11 @@
+"""SQL shared by the backends that reset a pooled or reused session.
+
+Kept free of driver imports so both the psycopg2 benchmark engine and the
+psycopg 3 async backend can use it.
+"""
+
+
+# Everything DISCARD ALL does except RESET ALL, so the session GUCs survive.
+# Unlike DISCARD ALL it may run as one multi-statement round trip.
+STATE_RESET_SQL = ("CLOSE ALL; DEALLOCATE ALL; UNLISTEN *; SELECT pg_advisory_unlock_all(); "
+                   "DISCARD PLANS; DISCARD TEMP; DISCARD SEQUENCES;")
@@ -0,0 +1,186 @@
+"""Canonical form and fingerprint of the generated SQL.
+
+Two statements get the same fingerprint when they only differ in whitespace,
+comments, keyword/identifier case, trailing semicolons or the names of their
+table aliases, so the benchmark and the report scripts can execute each
+distinct statement once and share its timings and result with every cell that
+maps to it.
+"""
+import hashlib
+import re
+
+
+TOKEN_RE = re.compile(r"""
+      (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>(?:[EeBbXxNn])?'(?:[^']|'')*')
+    | (?P<dollar>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+    | (?P<quoted>"(?:[^"]|"")*")
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<param>\$\d+)
+    | (?P<op>::|<=|>=|<>|!=|\|\||->>|->|\#>>|\#>|[^\sA-Za-z0-9_])
+    | (?P<space>\s+)
+""", re.VERBOSE | re.DOTALL)
+
+ALIAS_INTRODUCERS = {'from', 'join'}
+
+# PostgreSQL reserved, type/function-name and column-name keywords: quoting
+# one of them ("user", "order", "time") names an identifier, not the keyword
+KEYWORDS = {
+    'all', 'analyse', 'analyze', 'and', 'any', 'array', 'as', 'asc', 'asymmetric', 'both', 'case', 'cast',
+    'check', 'collate', 'column', 'constraint', 'create', 'current_catalog', 'current_date', 'current_role',
+    'current_time', 'current_timestamp', 'current_user', 'default', 'deferrable', 'desc', 'distinct', 'do',
+    'else', 'end', 'except', 'false', 'fetch', 'for', 'foreign', 'from', 'grant', 'group', 'having', 'in',
+    'initially', 'intersect', 'into', 'lateral', 'leading', 'limit', 'localtime', 'localtimestamp', 'not',
+    'null', 'offset', 'on', 'only', 'or', 'order', 'placing', 'primary', 'references', 'returning', 'select',
+    'session_user', 'some', 'symmetric', 'system_user', 'table', 'then', 'to', 'trailing', 'true', 'union',
+    'unique', 'user', 'using', 'variadic', 'when', 'where', 'window', 'with',
+    'authorization', 'binary', 'collation', 'concurrently', 'cross', 'current_schema', 'freeze', 'full',
+    'ilike', 'inner', 'is', 'isnull', 'join', 'left', 'like', 'natural', 'notnull', 'outer', 'overlaps',
+    'right', 'similar', 'tablesample', 'verbose',
+    'between', 'bigint', 'bit', 'boolean', 'char', 'character', 'coalesce', 'dec', 'decimal', 'exists',
+    'extract', 'float', 'greatest', 'grouping', 'inout', 'int', 'integer', 'interval', 'json', 'json_array',
+    'json_arrayagg', 'json_object', 'json_objectagg', 'json_scalar', 'json_serialize', 'least', 'national',
+    'nchar', 'none', 'normalize', 'numeric', 'out', 'overlay', 'position', 'precision', 'real', 'row',
+    'setof', 'smallint', 'substring', 'time', 'timestamp', 'treat', 'trim', 'values', 'varchar',
+    'xmlattributes', 'xmlconcat', 'xmlelement', 'xmlexists', 'xmlforest', 'xmlnamespaces', 'xmlparse',
+    'xmlpi', 'xmlroot', 'xmlserialize', 'xmltable',
+}
+
+# Words that can follow a table reference without being its alias
+NOT_ALIASES = {
+    'where', 'join', 'inner', 'left', 'right', 'full', 'outer', 'cross', 'natural',
+    'on', 'using', 'group', 'order', 'having', 'limit', 'offset', 'union', 'intersect',
+    'except', 'window', 'for', 'fetch', 'as', 'lateral', 'tablesample', 'returning',
+    'set', 'values', 'with', 'select', 'when', 'then', 'else', 'end', 'and', 'or',
+}
+
+
+def tokenize(sql):
+    """Split SQL into (kind, text) tokens, dropping comments and whitespace"""
+    tokens = []
+    for match in TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        if kind in ('comment', 'space'):
+            continue
+        if kind == 'tag':
+            kind = 'dollar'
+        text = match.group(0)
+        if kind == 'word':
+            text = text.lower()
+        elif kind == 'quoted' and re.fullmatch(r'"[a-z_][a-z0-9_$]*"', text) and text[1:-1] not in KEYWORDS:
+            # "name" and name are the same identifier when it is already lower case and not a keyword
+            kind, text = 'word', text[1:-1]
+        tokens.append((kind, text))
+    while tokens and tokens[-1] == ('op', ';'):
+        tokens.pop()
+    return tokens
+
+
+CLAUSE_KEYWORDS = NOT_ALIASES - ALIAS_INTRODUCERS - {
+    'inner', 'left', 'right', 'full', 'outer', 'cross', 'natural', 'lateral', 'as'}
+
+
+def _alias_after(tokens, j, aliases, optional_as):
+    """Register the alias (if any) that starts at position j"""
+    if j < len(tokens) and tokens[j] == ('word', 'as'):
+        optional_as.add(j)
+        j += 1
+    if j < len(tokens) and tokens[j][0] in ('word', 'quoted') and tokens[j][1] not in NOT_ALIASES:
+        aliases.setdefault(tokens[j][1], j)
+        return j
+    optional_as.discard(j - 1)
+    return j - 1
+
+
+def _table_aliases(tokens):
+    """Positions of the aliases given to FROM/JOIN items, of their optional AS and of the table names"""
+    aliases, optional_as, table_names = {}, set(), set()
+    in_from = False
+    stack = []
+    function_paren = None
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        starts_item = (in_from and i > 0 and tokens[i - 1][1] in ALIAS_INTRODUCERS | {',', 'lateral'}
+                       or i == function_paren)
+        if text == '(' and kind == 'op':
+            stack.append((in_from, starts_item))
+            in_from = False
+        elif text == ')' and kind == 'op' and stack:
+            in_from, was_item = stack.pop()
+            if was_item:
+                i = _alias_after(tokens, i + 1, aliases, optional_as)
+        elif kind == 'word' and text in ALIAS_INTRODUCERS:
+            in_from = True
+        elif kind == 'word' and text in CLAUSE_KEYWORDS:
+            in_from = False
+        elif starts_item and kind in ('word', 'quoted') and text not in NOT_ALIASES:
+            # table name, possibly schema qualified
+            j = i + 1
+            while j + 1 < len(tokens) and tokens[j][1] == '.' and tokens[j + 1][0] in ('word', 'quoted'):
+                j += 2
+            table_names.update(range(i, j))
+            if j < len(tokens) and tokens[j][1] == '(':
+                # table function, its alias follows the closing parenthesis
+                function_paren = j
+                i = j - 1
+            else:
+                i = _alias_after(tokens, j, aliases, optional_as)
+        i += 1
+    return aliases, optional_as, table_names
+
+
+def canonical_sql(sql):
+    """Whitespace, case, comment and table-alias insensitive form of a statement"""
+    tokens = tokenize(str(sql))
+    aliases, optional_as, table_names = _table_aliases(tokens)
+    # an alias also used bare (SELECT s FROM sensors s, a whole-row reference) keeps its name
+    bare = {text for i, (kind, text) in enumerate(tokens)
+            if kind in ('word', 'quoted') and text in aliases and aliases[text] != i
+            and not (i + 1 < len(tokens) and tokens[i + 1][1] == '.') and not (i > 0 and tokens[i - 1][1] == '.')}
+    kept = sorted(set(aliases) - bare, key=aliases.get)
+    renamed = {name: f'_t{n}' for n, name in enumerate(kept, 1)}
+    out = []
+    for i, (kind, text) in enumerate(tokens):
+        if i in optional_as:
+            continue
+        if text in renamed and kind in ('word', 'quoted'):
+            is_definition = aliases[text] == i
+            # a schema qualifier of a FROM item (FROM s.t s) is not a reference to the alias s
+            is_reference = (i + 1 < len(tokens) and tokens[i + 1][1] == '.' and (i == 0 or tokens[i - 1][1] != '.')
+                            and i not in table_names)
+            if is_definition or is_reference:
+                text = renamed[text]
+        out.append(text)
+    return ' '.join(out)
+
+
+def fingerprint(sql):
+    """Short stable hash of canonical_sql(sql)"""
+    return hashlib.sha1(canonical_sql(sql).encode('utf-8')).hexdigest()[:16]
+
+
+def syntax_problem(sql):
+    """Local check for statements the server would reject outright, None if it looks well formed"""
+    tokens = tokenize(str(sql))
+    if not tokens:
+        return 'empty statement'
+    depth = 0
+    for kind, text in tokens:
+        if kind == 'op' and text in ("'", '"', '$'):
+            return f'unterminated {text} literal'
+        if kind == 'op' and text == '(':
+            depth += 1
+        elif kind == 'op' and text == ')':
+            depth -= 1
+            if depth < 0:
+                return "unbalanced ')'"
+    if depth:
+        return "unbalanced '('"
+    return None
+
+
+def statement_count(sql):
+    """Number of ;-separated statements, ignoring trailing semicolons"""
+    return 1 + sum(1 for token in tokenize(str(sql)) if token == ('op', ';'))
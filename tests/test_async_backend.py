@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('psycopg_pool')
+
+import async_backend  # noqa: E402
+
+LIVE_DSN = os.environ.get('BENCHMARK_TEST_DSN')
+live = pytest.mark.skipif(not LIVE_DSN, reason='BENCHMARK_TEST_DSN is not set')
+
+
+def test_async_backend_does_not_import_the_engine():
+    code = "import sys, async_backend; print(sorted({'benchmark_engine', 'pandas', 'psycopg2'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    assert subprocess.check_output([sys.executable, '-c', code], cwd=root, text=True).strip() == '[]'
+
+
+@live
+def test_client_timeout_cancels_the_server_statement(monkeypatch):
+    # client deadline 0.5 s, statement_timeout 3 s: only the client side can stop pg_sleep(5)
+    monkeypatch.setattr(async_backend, 'CANCEL_GRACE', -2.5)
+    db_config = dict(item.split('=', 1) for item in LIVE_DSN.split())
+    start = time.perf_counter()
+
+    capture, = async_backend.capture_many(["SELECT pg_sleep(5)"], db_config, {'timeout_ms': 3000}, 1)
+
+    assert capture['Status'] == async_backend.CLIENT_TIMEOUT
+    assert time.perf_counter() - start < 2
+    with async_backend.psycopg.connect(LIVE_DSN) as conn:
+        running = conn.execute("SELECT count(*) FROM pg_stat_activity "
+                               "WHERE query = 'SELECT pg_sleep(5)' AND state = 'active';").fetchone()[0]
+    assert running == 0
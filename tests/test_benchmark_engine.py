@@ -0,0 +1,328 @@
+import csv
+import io
+import os
+import re
+
+import pytest
+
+pytest.importorskip('pandas')
+psycopg2 = pytest.importorskip('psycopg2')
+
+import benchmark_engine  # noqa: E402
+from psycopg2 import errors  # noqa: E402
+
+# libpq connection string of a scratch database for the live tests, e.g. "host=/tmp/pg dbname=postgres"
+LIVE_DSN = os.environ.get('BENCHMARK_TEST_DSN')
+live = pytest.mark.skipif(not LIVE_DSN, reason='BENCHMARK_TEST_DSN is not set')
+
+
+class FakeServerCursor:
+    """Cursor of a pretend server that keeps session GUCs the way PostgreSQL does
+
+    DISCARD ALL / RESET ALL restore the defaults, and pg_sleep(s) is cancelled
+    when it would outlast statement_timeout.
+    """
+
+    def __init__(self):
+        self.gucs = {'statement_timeout': '0'}
+        self.executed = []
+        self.row = None
+
+    def execute(self, sql, params=None):
+        for statement in filter(None, (part.strip() for part in sql.split(';'))):
+            self.executed.append(statement)
+            words = statement.split()
+            keyword = words[0].upper()
+            if keyword == 'SET':
+                self.gucs[words[1]] = words[-1].strip("'")
+            elif keyword == 'SHOW':
+                self.row = (self.gucs.get(words[1], ''),)
+            elif statement.upper() in ('DISCARD ALL', 'RESET ALL'):
+                self.gucs = {'statement_timeout': '0'}
+            elif 'pg_sleep' in statement:
+                seconds = float(re.search(r'pg_sleep\(([\d.]+)\)', statement).group(1))
+                timeout_ms = int(self.gucs['statement_timeout'])
+                if timeout_ms and seconds * 1000 > timeout_ms:
+                    raise errors.QueryCanceled('canceling statement due to statement timeout')
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeServerConnection:
+    """Connection whose cursors share one FakeServerCursor session"""
+
+    closed = 0
+
+    def __init__(self):
+        self.session = FakeServerCursor()
+
+    def cursor(self):
+        return self.session
+
+    def rollback(self):
+        pass
+
+
+class DroppedConnection(FakeServerConnection):
+    """Connection whose server goes away during the first pg_sleep"""
+
+    def __init__(self):
+        super().__init__()
+        self.session.execute = self.execute
+
+    def execute(self, sql, params=None):
+        if self.closed:
+            raise psycopg2.InterfaceError('connection already closed')
+        if 'pg_sleep' in sql:
+            self.closed = 2
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        FakeServerCursor.execute(self.session, sql, params)
+
+    def rollback(self):
+        if self.closed:
+            raise psycopg2.InterfaceError('connection already closed')
+
+
+def legacy_settings(**overrides):
+    return {**benchmark_engine.SETTINGS, 'measurement': 'legacy', **overrides}
+
+
+def per_nlq_settings(**overrides):
+    """Legacy settings whose NLQ 3 gets a 500 ms timeout (2 x a 250 ms reference median)"""
+    return legacy_settings(timeout_ms=60000, timeout_multiplier=2, timeout_floor_ms=100,
+                           reference_medians={'3': 0.25}, **overrides)
+
+
+@pytest.mark.parametrize('transport', ['separate', 'batched'])
+def test_legacy_run_keeps_the_statement_timeout(transport):
+    cursor = FakeServerCursor()
+
+    with pytest.raises(errors.QueryCanceled):
+        benchmark_engine._run_legacy(cursor, "SELECT pg_sleep(2)",
+                                     legacy_settings(timeout_ms=500, transport=transport))
+
+    assert 'DISCARD ALL' not in cursor.executed
+
+
+def test_legacy_run_restores_the_previous_timeout():
+    cursor = FakeServerCursor()
+
+    assert benchmark_engine._run_legacy(cursor, "SELECT pg_sleep(0.1)", legacy_settings(timeout_ms=500)) >= 0
+    assert cursor.gucs['statement_timeout'] == '0'
+
+
+@pytest.mark.parametrize('transport', ['separate', 'batched'])
+def test_per_nlq_timeout_cancels_legacy_runs(transport):
+    settings = per_nlq_settings(transport=transport, runs=4, max_timeouts=2)
+    settings['timeout_ms'] = benchmark_engine.query_timeout('3 - Which devices are offline?', settings)
+
+    results = benchmark_engine.benchmark_query("SELECT pg_sleep(2)", FakeServerConnection(), settings)
+
+    assert settings['timeout_ms'] == 500
+    assert results == ['Timeout', 'Timeout', benchmark_engine.SKIPPED, benchmark_engine.SKIPPED]
+
+
+def test_lost_connection_is_recorded_and_replaced(monkeypatch):
+    replacement = FakeServerConnection()
+    monkeypatch.setattr(benchmark_engine, 'connect', lambda db_config=None: replacement)
+
+    results = benchmark_engine.benchmark_query("SELECT pg_sleep(0.1)", DroppedConnection(), legacy_settings(runs=3))
+
+    assert results[0] == 'Error en ejecución'
+    assert all(isinstance(r, float) for r in results[1:])
+    assert 'SELECT pg_sleep(0.1)' in replacement.session.executed
+
+
+def adaptive_settings(**overrides):
+    return legacy_settings(adaptive=True, min_runs=3, max_runs=8, **overrides)
+
+
+def test_adaptive_series_without_success_stops_after_min_runs():
+    results = benchmark_engine.benchmark_query("SELECT pg_sleep(2)", FakeServerConnection(),
+                                               adaptive_settings(timeout_ms=500))
+
+    assert results == ['Timeout'] * 3
+
+
+def test_adaptive_run_starts_only_when_the_timeout_fits_the_deadline():
+    results = benchmark_engine.benchmark_query("SELECT pg_sleep(0.1)", FakeServerConnection(),
+                                               adaptive_settings(timeout_ms=5000, max_seconds=1))
+
+    assert len(results) == 1
+
+
+@live
+@pytest.mark.parametrize('query', ["SELEC 1", "SELECT 1/0"])
+def test_adaptive_series_stops_after_a_deterministic_error(query):
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        results = benchmark_engine.benchmark_query(query, conn, adaptive_settings())
+    finally:
+        conn.close()
+    assert len(results) == 1 and not isinstance(results[0], float)
+
+
+@live
+def test_terminated_backend_is_recorded_and_replaced():
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    admin = psycopg2.connect(LIVE_DSN)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s);", (conn.get_backend_pid(),))
+        settings = legacy_settings(runs=2, db_config={'dsn': LIVE_DSN})
+        results = benchmark_engine.benchmark_query("SELECT 1", conn, settings)
+    finally:
+        conn.close()
+        admin.close()
+    assert results[0] == 'Error en ejecución'
+    assert isinstance(results[1], float)
+
+
+@live
+@pytest.mark.parametrize('transport', ['separate', 'batched'])
+def test_per_nlq_timeout_fires_on_the_server(transport):
+    settings = per_nlq_settings(transport=transport, runs=2)
+    settings['timeout_ms'] = benchmark_engine.query_timeout('3 - Which devices are offline?', settings)
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        assert benchmark_engine.benchmark_query("SELECT pg_sleep(2)", conn, settings) == ['Timeout', 'Timeout']
+        results = benchmark_engine.benchmark_query("SELECT pg_sleep(0.1)", conn, settings)
+        assert all(isinstance(r, float) for r in results)
+    finally:
+        conn.close()
+
+
+@live
+@pytest.mark.parametrize('transport', ['separate', 'batched'])
+def test_legacy_timeout_fires_on_the_server(transport):
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        with pytest.raises(errors.QueryCanceled):
+            benchmark_engine._run_legacy(cursor, "SELECT pg_sleep(2)",
+                                         legacy_settings(timeout_ms=500, transport=transport))
+    finally:
+        conn.close()
+
+
+@live
+def test_buffercache_check_does_not_raise_without_the_extension():
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT current_setting('server_version_num')::int >= 170000 "
+                       "AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_buffercache');")
+        assert benchmark_engine.buffercache_available(conn) == cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('query', ["SELEC 1", "SELEC 1; SELECT 2"])
+def test_unknown_leading_keyword_is_sent_to_explain(query):
+    conn = FakeServerConnection()
+
+    benchmark_engine.validate_query(conn, query)
+
+    assert conn.session.executed[0].startswith('EXPLAIN (FORMAT JSON) SELEC 1')
+
+
+def test_statements_that_cannot_be_explained_are_checked_locally():
+    conn = FakeServerConnection()
+
+    assert benchmark_engine.validate_query(conn, "CREATE TABLE t (id int)") is None
+    assert conn.session.executed == []
+
+
+class PlanningFailure(Exception):
+    def __init__(self, pgcode):
+        super().__init__(f'planning failed with {pgcode}')
+        self.pgcode = pgcode
+
+
+class FailingPlanConnection(FakeServerConnection):
+    """Connection whose EXPLAIN fails with the given SQLSTATE"""
+
+    def __init__(self, pgcode):
+        super().__init__()
+        self.session.execute = lambda sql, params=None: (_ for _ in ()).throw(PlanningFailure(pgcode))
+
+
+@pytest.mark.parametrize('pgcode, validation', [('42703', 'Missing column'), ('42501', 'Invalid'),
+                                                ('22012', 'Type error')])
+def test_statement_errors_reject_the_statement(pgcode, validation):
+    assert benchmark_engine.validate_query(FailingPlanConnection(pgcode), "SELECT 1")['Validation'] == validation
+
+
+@pytest.mark.parametrize('pgcode', ['55P03', '57014', '08006', None])
+def test_transient_planning_failures_let_the_statement_run(pgcode):
+    assert benchmark_engine.validate_query(FailingPlanConnection(pgcode), "SELECT 1") is None
+
+
+@live
+def test_lock_timeout_while_planning_lets_the_statement_run():
+    holder = psycopg2.connect(LIVE_DSN)
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS validate_lock (id int); SET lock_timeout TO '100ms';")
+        with holder.cursor() as cursor:
+            cursor.execute("LOCK TABLE validate_lock;")
+        assert benchmark_engine.validate_query(conn, "SELECT * FROM validate_lock") is None
+    finally:
+        holder.rollback()
+        holder.close()
+        with conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS validate_lock;")
+        conn.close()
+
+
+@live
+def test_unknown_leading_keyword_is_a_syntax_error():
+    conn = psycopg2.connect(LIVE_DSN)
+    conn.autocommit = True
+    try:
+        problem = benchmark_engine.validate_query(conn, "SELEC 1")
+    finally:
+        conn.close()
+    assert problem['Validation'] == 'Syntax error'
+    assert problem['Error'] == 'Error de sintaxis'
+
+
+@pytest.mark.parametrize('overrides, result', [
+    ({'validate': True}, 'Error: column "nope" does not exist'),
+    ({'max_rows': 1000}, 'Error: Over budget (cost 900.0, rows 50000.0), not executed'),
+])
+def test_statements_kept_out_of_the_timed_runs_are_not_captured(monkeypatch, overrides, result):
+    monkeypatch.setattr(benchmark_engine, 'load_queries',
+                        lambda workbook, max_query: [('2 - big', 1, "SELECT nope FROM big")])
+    monkeypatch.setattr(benchmark_engine, 'validate_query', lambda conn, query, estimate=None: {
+        'Validation': 'Missing column', 'Error': 'Error en ejecución', 'Message': 'column "nope" does not exist'})
+    monkeypatch.setattr(benchmark_engine, 'estimate_query',
+                        lambda conn, query: {'Estimated Cost': 900.0, 'Estimated Rows': 50000.0})
+    captured = []
+    monkeypatch.setattr(benchmark_engine, 'capture_result', lambda conn, query, *args: captured.append(query))
+    report = []
+
+    benchmark_engine.run_model('M1', FakeServerConnection(), csv.writer(io.StringIO()),
+                               legacy_settings(runs=2, **overrides), report=report)
+
+    assert captured == []
+    assert report[0]['Result'] == result
+    assert report[0]['Execution Accuracy'] == 'Error'
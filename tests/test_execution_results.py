@@ -0,0 +1,35 @@
+import csv
+
+import pytest
+
+pytest.importorskip('pandas')
+
+from execution_results import load_execution_results  # noqa: E402
+
+
+def test_engine_run_log_is_read_as_utf8(tmp_path):
+    path = tmp_path / 'M1_resultados_ejecucion.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Model', 'NLQ', 'Query Number', 'Execution 1', 'Execution 2', 'Promedio', 'Desviación'])
+        writer.writerow(['M1', '1 - small', 'Q1', 0.5, 0.7, 0.6, 0.1414])
+        writer.writerow(['M1', '1 - small', 'Q2', 'Error en ejecución', 'Skipped', 'N/A', 'N/A'])
+
+    df = load_execution_results(path, runs=2)
+
+    assert 'Desviación' in df.columns
+    assert list(df['Status 1']) == ['OK', 'Error en ejecución']
+    assert list(df['Successes']) == [2, 0]
+
+
+def test_published_run_log_is_read_as_latin1(tmp_path):
+    path = tmp_path / 'M1_resultados_ejecucion.csv'
+    path.write_bytes('NLQ;Query Number;Execution 1;Promedio;Desviación\r\n'
+                     '1 - small;Q1;0,5;0,5;\r\n'
+                     '2 - big;Q1;Error en ejecución;;\r\n'.encode('latin-1'))
+
+    df = load_execution_results(path, runs=1)
+
+    assert 'Desviación' in df.columns
+    assert list(df['Execution 1'].fillna(-1)) == [0.5, -1]
+    assert list(df['Status 1']) == ['OK', 'Error en ejecución']
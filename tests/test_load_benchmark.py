@@ -0,0 +1,55 @@
+import random
+import time
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('psycopg2')
+
+import load_benchmark  # noqa: E402
+from benchmark_engine import prepared_name  # noqa: E402
+
+
+class RecordingConnection:
+    """Connection that fails an EXECUTE of a statement that was never PREPAREd"""
+
+    def __init__(self):
+        self.executed = []
+        self.prepared = set()
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        words = sql.rstrip(';').split()
+        if words[0] == 'PREPARE':
+            self.prepared.add(words[1])
+        elif words[0] == 'EXECUTE' and words[1] not in self.prepared:
+            raise RuntimeError(f'prepared statement "{words[1]}" does not exist')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def test_prepared_clients_prepare_each_statement_once(monkeypatch):
+    conn = RecordingConnection()
+    monkeypatch.setattr(load_benchmark, 'connect', lambda db_config: conn)
+    workload = [('M1', '1', 'Q1', "SELECT 1"), ('M1', '1', 'Q2', "SELECT 2")]
+    settings = {**load_benchmark.LOAD_SETTINGS, 'measurement': 'prepared', 'db_config': None}
+    samples = []
+
+    load_benchmark.client(workload, settings, time.perf_counter() + 0.2, random.Random(0), samples)
+
+    assert samples and all(outcome == 'OK' for *_, outcome in samples)
+    for _, _, _, query in workload:
+        assert conn.executed.count(f"PREPARE {prepared_name(query)} AS {query}") == 1
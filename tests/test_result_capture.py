@@ -0,0 +1,26 @@
+import pytest
+
+from result_capture import is_row_returning
+
+
+@pytest.mark.parametrize('query', [
+    "SELECT 1",
+    "  with a AS (SELECT 1) SELECT * FROM a",
+    "-- generated by the model\nSELECT * FROM sensors",
+    "/* NLQ 4 */ SELECT * FROM sensors",
+    "(SELECT 1) UNION (SELECT 2)",
+    "SELECT*FROM sensors",
+])
+def test_row_returning_statements(query):
+    assert is_row_returning(query)
+
+
+@pytest.mark.parametrize('query', [
+    "",
+    "-- only a comment",
+    "INSERT INTO t VALUES (1)",
+    "/* SELECT */ DELETE FROM t",
+    "selected_rows",
+])
+def test_other_statements(query):
+    assert not is_row_returning(query)
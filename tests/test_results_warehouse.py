@@ -0,0 +1,69 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+
+import results_warehouse  # noqa: E402
+
+SETTINGS = {'measurement': 'isolated', 'timeout_ms': 30000}
+STATS = {'promedio': 0.6, 'desviacion': 0.1, 'precision': 'N/A'}
+
+
+def write_model(root, model, cells):
+    warehouse = results_warehouse.Warehouse(root)
+    for nlq, query, results in cells:
+        warehouse.add_runs(model, nlq, query, results, SETTINGS)
+        warehouse.add_cell(model, nlq, query, results, STATS, execution_accuracy='Correct')
+    warehouse.close()
+
+
+def test_execution_table_is_wide_per_model(tmp_path):
+    root = str(tmp_path)
+    write_model(root, 'GPT-4o', [('1 - cows', 'Q1', [0.5, 0.7, 'Timeout']),
+                                 ('2 - where', 'Q2', ['Error de sintaxis', 'Error de sintaxis'])])
+    write_model(root, 'DeepSeek', [('1 - cows', 'Q1', [0.2])])
+
+    table = results_warehouse.execution_table('GPT-4o', root, runs=10)
+
+    assert [f'Execution {i}' for i in range(1, 11)] == [c for c in table.columns if c.startswith('Execution')]
+    assert list(table['NLQ']) == ['1 - cows', '2 - where']
+    assert list(table['Query Number']) == ['Q1', 'Q2']
+    first = table.iloc[0]
+    assert (first['Execution 1'], first['Execution 2']) == (0.5, 0.7)
+    assert first['Promedio'] == 0.6
+    # failed runs keep their status, as in the CSV run logs
+    assert table.iloc[1]['Execution 1'] == 'Error de sintaxis'
+
+
+def test_execution_table_keeps_more_runs_than_requested(tmp_path):
+    root = str(tmp_path)
+    write_model(root, 'GPT-4o', [('1 - cows', 'Q1', [0.1] * 12)])
+
+    table = results_warehouse.execution_table('GPT-4o', root, runs=10)
+
+    assert 'Execution 12' in table.columns
+
+
+def test_read_table_without_parts_is_typed_and_empty(tmp_path):
+    frame = results_warehouse.read_table('runs', str(tmp_path))
+
+    assert frame.empty
+    assert list(frame.columns) == list(results_warehouse.SCHEMAS['runs'])
+
+
+@pytest.mark.parametrize('first', [True, False])
+def test_parts_with_all_null_categories_do_not_hide_other_parts(tmp_path, first):
+    root = str(tmp_path)
+    empty = ('GPT-4o', {'validation': None, 'execution_accuracy': None})
+    filled = ('DeepSeek', {'validation': 'OK', 'execution_accuracy': 'Correct'})
+    for model, values in (empty, filled) if first else (filled, empty):
+        warehouse = results_warehouse.Warehouse(root)
+        warehouse.add_cell(model, '1 - cows', 'Q1', [0.5], STATS, **values)
+        warehouse.close()
+
+    cells = results_warehouse.read_table('cells', root).set_index('model')
+
+    assert cells.loc['DeepSeek', 'validation'] == 'OK'
+    assert cells.loc['DeepSeek', 'execution_accuracy'] == 'Correct'
+    assert pd.isna(cells.loc['GPT-4o', 'execution_accuracy'])
+    assert isinstance(cells['execution_accuracy'].dtype, pd.CategoricalDtype)
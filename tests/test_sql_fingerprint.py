@@ -0,0 +1,27 @@
+import pytest
+
+from sql_fingerprint import fingerprint
+
+
+@pytest.mark.parametrize('a, b', [
+    ('SELECT name FROM t', 'select  "name"\nFROM t;'),
+    ('SELECT a.x FROM t a', 'SELECT b.x FROM t AS b -- alias'),
+    ('SELECT s.a FROM public.t s', 'SELECT x.a FROM public.t x'),
+])
+def test_equivalent_statements_share_a_fingerprint(a, b):
+    assert fingerprint(a) == fingerprint(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    # quoted keywords are identifiers, unquoted ones are keywords
+    ('SELECT "user" FROM t', 'SELECT user FROM t'),
+    ('SELECT "current_date" FROM t', 'SELECT current_date FROM t'),
+    # a schema qualifier is not an alias, even when it is spelled like one
+    ('SELECT * FROM s.t s', 'SELECT * FROM x.t x'),
+    ('SELECT s.a FROM s.t s JOIN u ON true', 'SELECT x.a FROM x.t x JOIN u ON true'),
+    ('SELECT Name FROM t', 'SELECT "Name" FROM t'),
+    # a bare alias is a whole-row reference, a bare name under another alias is a column
+    ('SELECT s FROM sensors s', 'SELECT s FROM sensors t'),
+])
+def test_distinct_statements_do_not_collide(a, b):
+    assert fingerprint(a) != fingerprint(b)